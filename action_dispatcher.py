@@ -0,0 +1,297 @@
+import asyncio
+import time
+from datetime import timedelta
+from typing import Dict, Hashable, List, NamedTuple, Optional
+
+import discord
+import config
+from rate_limiter import RecentKeys, TokenBucketLimiter
+
+# Discord refuses bulk deletes for messages older than 14 days
+BULK_DELETE_MAX_AGE = timedelta(days=14)
+BULK_DELETE_MAX_COUNT = 100
+
+
+class ModerationAction(NamedTuple):
+    kind: str
+    rule: str
+    reason: str
+    target: object
+    guild_id: int
+    user_id: int
+    channel_id: int
+    message_id: int
+    submitted_at: float
+    timeout_minutes: int = 0
+    content: str = ""
+
+
+class ActionDispatcher:
+    """Queues moderation REST calls and paces them against Discord's buckets.
+
+    Each action kind (ban, timeout, delete, dm) has its own queue and worker
+    so a backlog of DMs never holds up bans. Bans and timeouts for the same
+    user are deduplicated, deletes are gathered per channel into bulk
+    deletes, and every call reserves a token from its route bucket and from
+    a shared budget so a raid doesn't starve vouch uploads or hit 429s.
+    """
+
+    KINDS = ('ban', 'timeout', 'delete', 'dm')
+
+    def __init__(self, bot, audit_log=None):
+        self.bot = bot
+        self.audit_log = audit_log
+        self.queues: Dict[str, asyncio.Queue] = {}
+        self.workers: List[asyncio.Task] = []
+        self.route_limiters = {
+            'ban': TokenBucketLimiter(config.DISPATCH_BAN_RATE, config.DISPATCH_BAN_BURST),
+            'timeout': TokenBucketLimiter(config.DISPATCH_TIMEOUT_RATE, config.DISPATCH_TIMEOUT_BURST),
+            'delete': TokenBucketLimiter(config.DISPATCH_DELETE_RATE, config.DISPATCH_DELETE_BURST),
+            'dm': TokenBucketLimiter(config.DISPATCH_DM_RATE, config.DISPATCH_DM_BURST)
+        }
+        self.global_limiter = TokenBucketLimiter(config.DISPATCH_GLOBAL_RATE, config.DISPATCH_GLOBAL_BURST)
+        self.recent_bans = RecentKeys(config.DISPATCH_DEDUPE_SECONDS)
+        self.recent_timeouts = RecentKeys(config.DISPATCH_DEDUPE_SECONDS)
+        self.recent_deletes = RecentKeys(config.DISPATCH_DEDUPE_SECONDS)
+        self.stats = {
+            'submitted': 0,
+            'deduplicated': 0,
+            'executed': 0,
+            'failed': 0,
+            'bulk_deletes': 0,
+            'rate_limited': 0
+        }
+
+    def ensure_started(self):
+        """Start the workers on first use (needs a running event loop)"""
+        if self.workers:
+            return
+        loop = asyncio.get_running_loop()
+        for kind in self.KINDS:
+            self.queues[kind] = asyncio.Queue()
+            worker = self.delete_worker if kind == 'delete' else self.action_worker
+            self.workers.append(loop.create_task(worker(kind)))
+
+    async def close(self, timeout: float = None):
+        """Give queued actions up to `timeout` seconds to run, then stop the workers"""
+        timeout = config.DISPATCH_DRAIN_SECONDS if timeout is None else timeout
+        if self.workers and timeout > 0:
+            try:
+                await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self.queues.values())), timeout)
+            except asyncio.TimeoutError:
+                left = sum(queue.qsize() for queue in self.queues.values())
+                print(f"Dispatcher stopped with {left} queued action(s) not run")
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    # Submission
+
+    def submit(self, kind: str, rule: str, reason: str, target, message: Optional[discord.Message] = None,
+               timeout_minutes: int = 0, content: str = "", user_id: int = 0):
+        """Queue an action; repeats for the same user/message are dropped"""
+        self.ensure_started()
+        self.stats['submitted'] += 1
+
+        guild = getattr(target, 'guild', None) or getattr(message, 'guild', None)
+        guild_id = guild.id if guild else 0
+        if kind == 'delete':
+            # Partial messages (bulk cleanup) carry no author
+            author = getattr(target, 'author', None)
+            user_id = author.id if author else user_id
+            channel_id = target.channel.id
+            message_id = target.id
+        else:
+            user_id = target.id
+            channel_id = message.channel.id if message else 0
+            message_id = message.id if message else 0
+
+        action = ModerationAction(
+            kind=kind,
+            rule=rule,
+            reason=reason,
+            target=target,
+            guild_id=guild_id,
+            user_id=user_id,
+            channel_id=channel_id,
+            message_id=message_id,
+            submitted_at=time.monotonic(),
+            timeout_minutes=timeout_minutes,
+            content=content
+        )
+        recent, key = self.dedupe_key(action)
+        if recent is not None and not recent.add(key):
+            self.stats['deduplicated'] += 1
+            return
+        self.queues[kind].put_nowait(action)
+
+    def dedupe_key(self, action: ModerationAction):
+        """The recent-key set and key that deduplicate an action, if any"""
+        if action.kind == 'ban':
+            return self.recent_bans, (action.guild_id, action.user_id)
+        if action.kind == 'timeout':
+            return self.recent_timeouts, (action.guild_id, action.user_id)
+        if action.kind == 'delete':
+            return self.recent_deletes, action.message_id
+        return None, None
+
+    def allow_retry(self, action: ModerationAction):
+        """Drop a failed action's dedupe key so a later submit is not swallowed"""
+        recent, key = self.dedupe_key(action)
+        if recent is not None:
+            recent.discard(key)
+
+    def delete(self, message, rule: str = "", reason: str = "", user_id: int = 0):
+        self.submit('delete', rule, reason, message, user_id=user_id)
+
+    def ban(self, member, rule: str = "", reason: str = "", message: Optional[discord.Message] = None):
+        self.submit('ban', rule, reason, member, message)
+
+    def timeout(self, member, minutes: int, rule: str = "", reason: str = "", message: Optional[discord.Message] = None):
+        self.submit('timeout', rule, reason, member, message, timeout_minutes=minutes)
+
+    def send_dm(self, user, content: str, rule: str = "", message: Optional[discord.Message] = None):
+        self.submit('dm', rule, "", user, message, content=content)
+
+    # Workers
+
+    async def pace(self, kind: str, route: Hashable):
+        """Wait for both the route bucket and the shared budget"""
+        delay = max(
+            self.route_limiters[kind].reserve(route),
+            self.global_limiter.reserve('global')
+        )
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def action_worker(self, kind: str):
+        """Run bans, timeouts and DMs one at a time"""
+        queue = self.queues[kind]
+        while True:
+            action = await queue.get()
+            try:
+                await self.pace(kind, action.guild_id if kind != 'dm' else 'dm')
+                await self.run_action(action)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Dispatcher error running {kind} for user {action.user_id}: {e}")
+                self.allow_retry(action)
+            finally:
+                queue.task_done()
+
+    async def run_action(self, action: ModerationAction) -> bool:
+        """Execute a single non-delete action"""
+        status = "ok"
+        try:
+            if action.kind == 'ban':
+                await action.target.ban(reason=action.reason)
+            elif action.kind == 'timeout':
+                await action.target.timeout(timedelta(minutes=action.timeout_minutes), reason=action.reason)
+            elif action.kind == 'dm':
+                await action.target.send(action.content, delete_after=10)
+            self.stats['executed'] += 1
+        except discord.NotFound:
+            # User already gone
+            status = "not_found"
+        except discord.Forbidden:
+            print(f"Cannot {action.kind} user {action.user_id} ({action.rule}) - insufficient permissions")
+            status = "forbidden"
+        except discord.HTTPException as e:
+            if e.status == 429:
+                self.stats['rate_limited'] += 1
+            print(f"Error running {action.kind} for user {action.user_id} ({action.rule}): {e}")
+            status = "failed"
+        if status in ("forbidden", "failed"):
+            self.stats['failed'] += 1
+        if status == "failed":
+            # Rate limited or a server error: the next violation may try again
+            self.allow_retry(action)
+        self.record(action, status)
+        return status == "ok"
+
+    def record(self, action: ModerationAction, status: str):
+        """Write an executed action to the audit log, with latency since submit"""
+        if self.audit_log is None:
+            return
+        self.audit_log.record(
+            action.kind,
+            action.rule,
+            action.guild_id,
+            action.user_id,
+            action.channel_id,
+            action.message_id,
+            (time.monotonic() - action.submitted_at) * 1000,
+            status
+        )
+
+    async def delete_worker(self, kind: str):
+        """Gather deletes for a short window and bulk-delete per channel"""
+        queue = self.queues[kind]
+        while True:
+            batch = [await queue.get()]
+            try:
+                await asyncio.sleep(config.DISPATCH_BATCH_SECONDS)
+                while not queue.empty():
+                    batch.append(queue.get_nowait())
+
+                by_channel: Dict[int, List[ModerationAction]] = {}
+                for action in batch:
+                    by_channel.setdefault(action.channel_id, []).append(action)
+
+                for channel_id, actions in by_channel.items():
+                    await self.delete_channel_batch(channel_id, actions)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Dispatcher error deleting messages: {e}")
+            finally:
+                for _ in batch:
+                    queue.task_done()
+
+    async def delete_channel_batch(self, channel_id: int, actions: List[ModerationAction]):
+        """Delete one channel's messages with as few calls as possible"""
+        cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+        bulk, single = [], []
+        for action in actions:
+            (bulk if discord.utils.snowflake_time(action.message_id) > cutoff else single).append(action)
+        channel = actions[0].target.channel
+
+        for start in range(0, len(bulk), BULK_DELETE_MAX_COUNT):
+            chunk = bulk[start:start + BULK_DELETE_MAX_COUNT]
+            if len(chunk) == 1:
+                single.extend(chunk)
+                continue
+            await self.pace('delete', channel_id)
+            try:
+                await channel.delete_messages([a.target for a in chunk])
+                self.stats['bulk_deletes'] += 1
+                self.stats['executed'] += len(chunk)
+                for action in chunk:
+                    self.record(action, "ok")
+            except discord.HTTPException as e:
+                # Fall back to individual deletes (e.g. a message was already gone)
+                print(f"Bulk delete failed in channel {channel_id}: {e}")
+                single.extend(chunk)
+
+        for action in single:
+            await self.pace('delete', channel_id)
+            status = "ok"
+            try:
+                await action.target.delete()
+                self.stats['executed'] += 1
+            except discord.NotFound:
+                status = "not_found"
+            except discord.Forbidden:
+                print(f"Cannot delete message in channel {channel_id} - insufficient permissions")
+                self.stats['failed'] += 1
+                status = "forbidden"
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    self.stats['rate_limited'] += 1
+                print(f"Error deleting message {action.message_id}: {e}")
+                self.stats['failed'] += 1
+                status = "failed"
+                self.allow_retry(action)
+            self.record(action, status)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Append-only moderation audit log.
+
+Each moderation action is one tab-separated line:
+
+    timestamp  action  rule  guild_id  user_id  channel_id  message_id  latency_ms  status
+
+Lines are buffered in memory and appended by a background writer, and the
+file is rotated by size (audit.log, audit.log.1, ... audit.log.N).
+
+The CLI streams the log (oldest rotation first) without loading it into
+memory:
+
+    python audit_log.py stats [--since 7d] [--action ban] [--rule scam_domain] [--top 10]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+import aiofiles
+
+FIELDS = ('timestamp', 'action', 'rule', 'guild_id', 'user_id', 'channel_id', 'message_id', 'latency_ms', 'status')
+
+
+class AuditEntry(NamedTuple):
+    timestamp: float
+    action: str
+    rule: str
+    guild_id: int
+    user_id: int
+    channel_id: int
+    message_id: int
+    latency_ms: float
+    status: str
+
+    def to_line(self) -> str:
+        return (f"{self.timestamp:.3f}\t{self.action}\t{self.rule or '-'}\t{self.guild_id}\t{self.user_id}\t"
+                f"{self.channel_id}\t{self.message_id}\t{self.latency_ms:.1f}\t{self.status}\n")
+
+    @classmethod
+    def from_line(cls, line: str) -> Optional['AuditEntry']:
+        parts = line.rstrip('\n').split('\t')
+        if len(parts) != len(FIELDS):
+            return None
+        try:
+            return cls(float(parts[0]), parts[1], parts[2], int(parts[3]), int(parts[4]),
+                       int(parts[5]), int(parts[6]), float(parts[7]), parts[8])
+        except ValueError:
+            return None
+
+
+class AuditLog:
+    """Buffers audit entries and appends them from a background task"""
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backups: int = 5,
+                 flush_seconds: float = 2.0, max_buffer: int = 1000):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_seconds = flush_seconds
+        self.max_buffer = max_buffer
+        self.buffer: List[str] = []
+        self.writer: Optional[asyncio.Task] = None
+        self.wakeup: Optional[asyncio.Event] = None
+        self.closing = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def ensure_started(self):
+        """Start the writer on first use (needs a running event loop)"""
+        if self.writer is None:
+            self.closing = False
+            self.wakeup = asyncio.Event()
+            self.writer = asyncio.get_running_loop().create_task(self.write_loop())
+
+    def record(self, action: str, rule: str = "", guild_id: int = 0, user_id: int = 0, channel_id: int = 0,
+               message_id: int = 0, latency_ms: float = 0.0, status: str = "ok"):
+        """Queue one entry; never blocks on disk"""
+        if not self.enabled:
+            return
+        self.ensure_started()
+        self.buffer.append(AuditEntry(time.time(), action, rule, guild_id, user_id, channel_id,
+                                      message_id, latency_ms, status).to_line())
+        if len(self.buffer) >= self.max_buffer:
+            self.wakeup.set()
+
+    async def write_loop(self):
+        while not self.closing:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+            await self.flush()
+
+    async def flush(self):
+        """Append everything buffered so far"""
+        if not self.buffer:
+            return
+        lines, self.buffer = self.buffer, []
+        try:
+            self.rotate_if_needed()
+            async with aiofiles.open(self.path, 'a') as f:
+                await f.write(''.join(lines))
+        except OSError as e:
+            print(f"Error writing audit log {self.path}: {e}")
+        except asyncio.CancelledError:
+            # Put the swapped-out lines back for the next flush
+            self.buffer[:0] = lines
+            raise
+
+    def rotate_if_needed(self):
+        """Shift audit.log -> audit.log.1 -> ... once the file is full"""
+        try:
+            if os.path.getsize(self.path) < self.max_bytes:
+                return
+        except OSError:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            return
+        for index in range(self.backups - 1, 0, -1):
+            source = f"{self.path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    async def close(self):
+        """Stop the writer and flush what is left"""
+        if self.writer:
+            # Let a flush in progress finish instead of cancelling it mid-write
+            self.closing = True
+            self.wakeup.set()
+            await asyncio.gather(self.writer, return_exceptions=True)
+            self.writer = None
+        await self.flush()
+
+
+def log_files(path: str) -> List[str]:
+    """The log and its rotations, oldest first"""
+    files = []
+    index = 1
+    while os.path.exists(f"{path}.{index}"):
+        files.append(f"{path}.{index}")
+        index += 1
+    files.reverse()
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_entries(paths: List[str]) -> Iterator[AuditEntry]:
+    """Stream entries line by line, skipping malformed ones"""
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                entry = AuditEntry.from_line(line)
+                if entry:
+                    yield entry
+
+
+def parse_since(value: str) -> float:
+    """'90m', '12h' or '7d' -> seconds"""
+    units = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+    if value and value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+def summarize(entries: Iterator[AuditEntry], since: Optional[float] = None, action: str = "",
+              rule: str = "") -> Dict:
+    """Counts per action, rule and status plus per-user totals, in one pass"""
+    summary = {'actions': Counter(), 'rules': Counter(), 'status': Counter(), 'users': Counter()}
+    latency_total = 0.0
+    for entry in entries:
+        if since and entry.timestamp < since:
+            continue
+        if action and entry.action != action:
+            continue
+        if rule and entry.rule != rule:
+            continue
+        summary['actions'][entry.action] += 1
+        summary['rules'][entry.rule] += 1
+        summary['status'][entry.status] += 1
+        if entry.user_id:
+            summary['users'][entry.user_id] += 1
+        latency_total += entry.latency_ms
+    total = sum(summary['actions'].values())
+    summary['total'] = total
+    summary['avg_latency_ms'] = latency_total / total if total else 0.0
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the moderation audit log")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    stats = sub.add_parser('stats', help="Counts and top offenders")
+    stats.add_argument('--log', default=None, help="Log path (default: config.AUDIT_LOG_FILE)")
+    stats.add_argument('--since', default='', help="Only entries newer than e.g. 12h, 7d")
+    stats.add_argument('--action', default='', help="Filter by action (ban, timeout, delete, dm, log)")
+    stats.add_argument('--rule', default='', help="Filter by rule name")
+    stats.add_argument('--top', type=int, default=10, help="Top offenders to show")
+
+    args = parser.parse_args(argv)
+
+    path = args.log
+    if path is None:
+        import config
+        path = config.AUDIT_LOG_FILE
+    files = log_files(path)
+    if not files:
+        print(f"No audit log at {path}")
+        return 1
+
+    since = time.time() - parse_since(args.since) if args.since else None
+    summary = summarize(read_entries(files), since, args.action, args.rule)
+
+    print(f"📜 {summary['total']} entries from {len(files)} file(s)")
+    for title in ('actions', 'rules', 'status'):
+        print(f"\n{title.capitalize()}:")
+        for name, count in summary[title].most_common():
+            print(f"  {name:24} {count}")
+    print(f"\nAverage latency: {summary['avg_latency_ms']:.1f} ms")
+    print(f"\nTop {args.top} users:")
+    for user_id, count in summary['users'].most_common(args.top):
+        print(f"  {user_id:<24} {count}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
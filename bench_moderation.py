@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for per-message moderation cost.
+
+Compares the original checks (case-sensitive discord.gg regex, substring
+scam-domain scan, channel checks) against the normalized invite scanner and
+the compiled rule engine on a synthetic corpus of typical chat messages.
+
+Usage:
+    python bench_moderation.py [--messages 20000] [--rounds 5]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from domain_matcher import DomainMatcher
+from rule_engine import DEFAULT_RULES, RuleEngine
+from text_normalizer import find_invite_in
+
+SCAM_DOMAINS = ['scam.com', 'malicious.net', 'fake-discord.com']
+
+TYPICAL_MESSAGES = [
+    "lol",
+    "gm everyone",
+    "anyone around to help with my order?",
+    "just got mine, thanks bob 🔥🔥",
+    "how long does shipping usually take",
+    "check the pinned messages in #faq",
+    "yeah that works for me, ping me when it's restocked",
+    "is the store open this weekend? asking for a friend",
+    "https://imgur.com/a/Xy12Ab looks legit",
+    "ok 👍",
+    "I paid with paypal yesterday and still waiting on the confirmation email",
+    "bro what 😂",
+    "vouch incoming, give me a sec to upload",
+    "can a mod look at ticket 1234 please",
+    "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    "thanks!!",
+    "café prices went up again 😩",
+]
+
+BAD_MESSAGES = [
+    "join my server discord.gg/abc123",
+    "free nitro at https://fake-discord.com/claim",
+    "DISCORD.GG/SHOUTING",
+    "disc\u200bord.gg/hidden",
+]
+
+
+def build_corpus(size: int, bad_ratio: float = 0.01):
+    """Typical chat with a small share of bad messages mixed in"""
+    rng = random.Random(1234)
+    corpus = []
+    for _ in range(size):
+        pool = BAD_MESSAGES if rng.random() < bad_ratio else TYPICAL_MESSAGES
+        corpus.append(rng.choice(pool))
+    return corpus
+
+
+def time_per_message(check, corpus, rounds: int) -> float:
+    """Best-of-N nanoseconds per message"""
+    best = float('inf')
+    for _ in range(rounds):
+        start = time.perf_counter_ns()
+        for content in corpus:
+            check(content)
+        best = min(best, (time.perf_counter_ns() - start) / len(corpus))
+    return best
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark per-message moderation checks")
+    parser.add_argument('--messages', type=int, default=20000, help="Corpus size")
+    parser.add_argument('--rounds', type=int, default=5, help="Timing rounds (best is reported)")
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.messages)
+
+    old_invite = re.compile(r'discord\.gg/[a-zA-Z0-9]+')
+
+    # Shaped like the original Moderation.contains_invite_link
+    def original_invite_check(content):
+        return bool(old_invite.search(content))
+
+    # Content and channel checks of the original Moderation.check_message
+    order_channel_ids = [1, 2]
+    support_channel_id = 3
+
+    def original_checks(content, channel_id=0):
+        if old_invite.search(content):
+            return True
+        content_lower = content.lower()
+        if any(domain in content_lower for domain in SCAM_DOMAINS):
+            return True
+        return channel_id in order_channel_ids or channel_id == support_channel_id
+
+    engine = RuleEngine(DEFAULT_RULES, DomainMatcher(SCAM_DOMAINS))
+
+    # Shaped like the current Moderation.contains_invite_link
+    def normalized_invite_check(content):
+        return find_invite_in(content) is not None
+
+    def rule_engine(content):
+        return engine.evaluate(content, 0)
+
+    print(f"📏 {len(corpus)} messages, best of {args.rounds} rounds")
+    baseline = time_per_message(original_invite_check, corpus, args.rounds)
+    results = [
+        ("original invite regex", baseline),
+        ("normalized invite scanner", time_per_message(normalized_invite_check, corpus, args.rounds)),
+        ("original check_message", time_per_message(original_checks, corpus, args.rounds)),
+        ("rule engine (default rules)", time_per_message(rule_engine, corpus, args.rounds)),
+    ]
+    for name, ns in results:
+        print(f"{name:32} {ns:8.0f} ns/msg  ({ns / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
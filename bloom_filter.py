@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Compact on-disk scam domain feeds.
+
+A feed is a pair of files built offline from a (possibly multi-million line)
+domain list:
+
+    <prefix>.bloom   - Bloom filter probed first; clean hosts stop here
+    <prefix>.sorted  - sorted, de-duplicated domains for exact confirmation
+
+Both are memory-mapped read-only, so the bot only pages in the bytes it
+actually probes instead of holding the whole list in a trie.
+
+Usage:
+    python bloom_filter.py build domains.txt data/scam_feed [--error-rate 0.001]
+    python bloom_filter.py check data/scam_feed sub.scam.com
+"""
+
+import argparse
+import hashlib
+import math
+import mmap
+import os
+import struct
+import sys
+from typing import Iterable, Optional
+
+from domain_matcher import load_domain_file, normalize_host
+
+BLOOM_MAGIC = b'BLM1'
+# magic, number of bits, number of hash functions, number of items
+BLOOM_HEADER = struct.Struct('<4sQIQ')
+
+
+def _hash_pair(item: bytes):
+    """Two independent 64-bit hashes for double hashing"""
+    digest = hashlib.blake2b(item, digest_size=16).digest()
+    return int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+
+
+class BloomFilter:
+    """Bloom filter over bytes, backed by a bytearray or a read-only mmap"""
+
+    def __init__(self, num_bits: int, num_hashes: int, bits=None, offset: int = 0, count: int = 0):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bits if bits is not None else bytearray((num_bits + 7) // 8)
+        self.offset = offset
+        self.count = count
+
+    @classmethod
+    def for_capacity(cls, capacity: int, error_rate: float = 0.001) -> 'BloomFilter':
+        """Size a filter for `capacity` items at the given false-positive rate"""
+        capacity = max(capacity, 1)
+        num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        num_hashes = max(1, int(round(num_bits / capacity * math.log(2))))
+        return cls(num_bits, num_hashes)
+
+    def _positions(self, item: bytes):
+        h1, h2 = _hash_pair(item)
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item: bytes):
+        """Add an item (only valid on a writable filter)"""
+        for bit in self._positions(item):
+            self.bits[bit >> 3] |= 1 << (bit & 7)
+        self.count += 1
+
+    def __contains__(self, item: bytes) -> bool:
+        bits = self.bits
+        offset = self.offset
+        for bit in self._positions(item):
+            if not bits[offset + (bit >> 3)] & (1 << (bit & 7)):
+                return False
+        return True
+
+    def save(self, path: str):
+        """Write the filter to disk"""
+        with open(path, 'wb') as f:
+            f.write(BLOOM_HEADER.pack(BLOOM_MAGIC, self.num_bits, self.num_hashes, self.count))
+            f.write(self.bits)
+
+    @classmethod
+    def open(cls, path: str) -> 'BloomFilter':
+        """Memory-map a filter written by `save`"""
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, num_bits, num_hashes, count = BLOOM_HEADER.unpack_from(mapped, 0)
+        if magic != BLOOM_MAGIC:
+            raise ValueError(f"{path} is not a bloom filter file")
+        return cls(num_bits, num_hashes, bits=mapped, offset=BLOOM_HEADER.size, count=count)
+
+
+class SortedDomainFile:
+    """Exact membership over a sorted newline-separated file via binary search"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.data = b''
+        if os.path.getsize(path):
+            with open(path, 'rb') as f:
+                self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __contains__(self, key: bytes) -> bool:
+        data = self.data
+        lo, hi = 0, len(data)
+        # Invariant: lo is always at the start of a line
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = data.rfind(b'\n', lo, mid) + 1 or lo
+            end = data.find(b'\n', start)
+            if end == -1:
+                end = len(data)
+            line = data[start:end]
+            if line == key:
+                return True
+            if line < key:
+                lo = end + 1
+            else:
+                hi = start
+        return False
+
+
+class DomainFeed:
+    """Bloom pre-filter in front of an exact on-disk domain lookup"""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.bloom = BloomFilter.open(prefix + '.bloom')
+        self.exact = SortedDomainFile(prefix + '.sorted')
+        self.probes = 0
+        self.bloom_hits = 0
+        self.false_positives = 0
+
+    def __len__(self) -> int:
+        return self.bloom.count
+
+    def match(self, host: str) -> Optional[str]:
+        """Return the most specific listed suffix of `host`, if any"""
+        labels = host.split('.')
+        # Most specific first: sub.scam.com, scam.com, com
+        for i in range(len(labels)):
+            suffix = '.'.join(labels[i:]).encode('utf-8')
+            self.probes += 1
+            if suffix not in self.bloom:
+                continue
+            self.bloom_hits += 1
+            if suffix in self.exact:
+                return suffix.decode('utf-8')
+            self.false_positives += 1
+        return None
+
+
+def build_feed(domains: Iterable[str], prefix: str, error_rate: float = 0.001) -> int:
+    """Build `<prefix>.bloom` and `<prefix>.sorted` from a domain list"""
+    normalized = sorted({host.encode('utf-8') for host in map(normalize_host, domains) if host})
+
+    directory = os.path.dirname(prefix)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    bloom = BloomFilter.for_capacity(len(normalized), error_rate)
+    for domain in normalized:
+        bloom.add(domain)
+    bloom.save(prefix + '.bloom')
+
+    with open(prefix + '.sorted', 'wb') as f:
+        f.write(b'\n'.join(normalized))
+
+    return len(normalized)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query compact scam domain feeds")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help="Build a feed from a domain list")
+    build.add_argument('source', help="Newline-separated domain list")
+    build.add_argument('prefix', help="Output path prefix (writes .bloom and .sorted)")
+    build.add_argument('--error-rate', type=float, default=0.001, help="Bloom false-positive rate")
+
+    check = subparsers.add_parser('check', help="Look up hosts in a feed")
+    check.add_argument('prefix', help="Feed path prefix")
+    check.add_argument('hosts', nargs='+', help="Hosts to look up")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        count = build_feed(load_domain_file(args.source), args.prefix, args.error_rate)
+        bloom_size = os.path.getsize(args.prefix + '.bloom')
+        print(f"✅ Built feed with {count} domains ({bloom_size / 1024 / 1024:.2f}MB bloom filter)")
+    else:
+        feed = DomainFeed(args.prefix)
+        for host in args.hosts:
+            print(f"{host}: {feed.match(normalize_host(host)) or 'clean'}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
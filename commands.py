@@ -1,19 +1,160 @@
+from typing import Optional
 import discord
 from discord import app_commands
 from discord.ext import commands
 import config
-from data_manager import DataManager
+from invite_analytics import format_duration, format_rate
+from leaderboard_publisher import LeaderboardPublisher
+from verification_system import scan_job
+
+# Leaderboard page buttons carry their cursor in the custom id ("lb:<board>:<prev|next>:<score>:<user id>"),
+# so open leaderboards hold no state in the bot and keep paging across restarts
+LEADERBOARD_BUTTON_PREFIX = "lb:"
+
+# board -> (embed title, rankings field name, empty board text)
+BOARD_STYLES = {
+    'points': ("🏆 Points Leaderboard", "Rankings", "No points earned yet!"),
+    'invites': ("📊 Invite Leaderboard", "🏆 Rankings", "No invites tracked yet!")
+}
 
 class BotCommands(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.data_manager = DataManager()
+        # Shared with the other systems so every read sees every write
+        self.data_manager = bot.data_manager
+        # One self-updating pinned message per guild and board
+        self.publisher = LeaderboardPublisher(bot, self.leaderboard_page)
+
+    async def cog_load(self):
+        if self.publisher.interval > 0:
+            self.bot.jobs.submit("leaderboard_refresh", self.publisher.run)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        await self.publisher.forget_guild(guild.id)
+
+    def render_rows(self, guild_id: int, board: str, start: int, rows: list, medals: bool = False) -> str:
+        """Ranked lines for leaderboard rows, the first ranked start+1"""
+        # Names the bot doesn't know yet are fetched in the background and re-rendered
+        names = self.bot.names.resolve(guild_id, [int(user_id) for user_id, _ in rows])
+        leaderboard_text = ""
+        for i, (user_id, count) in enumerate(rows, start):
+            username = names.get(int(user_id), f"User {user_id}")
+            if medals:
+                rank = "🥇" if i == 0 else "🥈" if i == 1 else "🥉" if i == 2 else f"{i+1}."
+            else:
+                rank = f"{i+1}."
+            leaderboard_text += f"{rank} {username}: {count} {board}\n"
+        return leaderboard_text
+
+    def render_leaderboard(self, guild_id: int, board: str, size: int, medals: bool = False) -> str:
+        """Top of the 'points' or 'invites' board, reused until a score change could alter it"""
+        cache = self.data_manager.leaderboard_cache
+        leaderboard_text = cache.get(guild_id, board, (size, medals))
+        if leaderboard_text is not None:
+            return leaderboard_text
+        
+        leaderboard = self.data_manager.ranking(guild_id, board).page(0, size)
+        leaderboard_text = self.render_rows(guild_id, board, 0, leaderboard, medals)
+        cache.put(guild_id, board, (size, medals), size, leaderboard, leaderboard_text)
+        return leaderboard_text
+
+    def leaderboard_page(self, guild_id: int, board: str, start: int = 0, rows: Optional[list] = None):
+        """(embed, buttons) for the page of a board starting at index `start`"""
+        size = config.LEADERBOARD_PAGE_SIZE
+        ranking = self.data_manager.ranking(guild_id, board)
+        total = len(ranking)
+        title, field_name, empty_text = BOARD_STYLES[board]
+        # A stopped view is sent but not kept in the client's view store; on_interaction handles the presses
+        view = discord.ui.View(timeout=None)
+        view.stop()
+        if not total:
+            return discord.Embed(title=title, description=empty_text, color=config.EMBED_COLORS['info']), view
+        
+        # Paging past rows that dropped off the end shows the last page instead
+        if rows is not None and not rows:
+            start = max(0, total - size)
+            rows = None
+        if start == 0:
+            # The first page is always a full page, served from the render cache
+            rows = ranking.page(0, size)
+            leaderboard_text = self.render_leaderboard(guild_id, board, size, medals=True)
+            description = f"Top {size} members by {board}"
+        else:
+            rows = ranking.page(start, size) if rows is None else rows
+            leaderboard_text = self.render_rows(guild_id, board, start, rows, medals=True)
+            description = f"Ranks {start + 1}-{start + len(rows)} of {total}"
+        
+        embed = discord.Embed(title=title, description=description, color=config.EMBED_COLORS['success'])
+        embed.add_field(name=field_name, value=leaderboard_text, inline=False)
+        pages = (total + size - 1) // size
+        embed.set_footer(text=f"Page {min(start // size + 1, pages)}/{pages}")
+        
+        first_user, first_score = rows[0]
+        last_user, last_score = rows[-1]
+        view.add_item(discord.ui.Button(
+            label="◀ Previous", style=discord.ButtonStyle.secondary, disabled=start == 0,
+            custom_id=f"{LEADERBOARD_BUTTON_PREFIX}{board}:prev:{first_score}:{first_user}"
+        ))
+        view.add_item(discord.ui.Button(
+            label="Next ▶", style=discord.ButtonStyle.secondary, disabled=start + len(rows) >= total,
+            custom_id=f"{LEADERBOARD_BUTTON_PREFIX}{board}:next:{last_score}:{last_user}"
+        ))
+        return embed, view
+
+    async def publish_board(self, interaction: discord.Interaction, board: str, channel: discord.TextChannel):
+        """Pin a self-updating board in `channel`, or refresh the one already there"""
+        await interaction.response.send_message(
+            f"Publishing {board} leaderboard to {channel.mention}...",
+            ephemeral=True
+        )
+        
+        if await self.publisher.publish(interaction.guild_id, board, channel):
+            status = f"{board.capitalize()} leaderboard pinned in {channel.mention}!"
+        else:
+            status = f"{board.capitalize()} leaderboard in {channel.mention} is already pinned and up to date."
+        if self.publisher.interval > 0:
+            status += f" It updates every {self.publisher.interval / 60:.0f} min when rankings change."
+        await interaction.followup.send(status, ephemeral=True)
+
+    @commands.Cog.listener()
+    async def on_interaction(self, interaction: discord.Interaction):
+        """Turn leaderboard pages from their buttons' cursors"""
+        if interaction.type != discord.InteractionType.component or interaction.guild_id is None:
+            return
+        custom_id = (interaction.data or {}).get('custom_id', '')
+        if not custom_id.startswith(LEADERBOARD_BUTTON_PREFIX):
+            return
+        try:
+            board, direction, score, user_id = custom_id[len(LEADERBOARD_BUTTON_PREFIX):].split(':')
+            cursor = (int(score), int(user_id))
+        except ValueError:
+            return
+        if board not in BOARD_STYLES:
+            return
+        
+        try:
+            ranking = self.data_manager.ranking(interaction.guild_id, board)
+            size = config.LEADERBOARD_PAGE_SIZE
+            if direction == 'next':
+                start, rows = ranking.after(cursor, size)
+            else:
+                start, rows = ranking.before(cursor, size)
+            embed, view = self.leaderboard_page(interaction.guild_id, board, start, rows)
+            if interaction.message is not None and self.publisher.pinned(interaction.guild_id, interaction.message.id):
+                # Pinned boards stay on their first page; page through a private copy instead
+                await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
+            else:
+                await interaction.response.edit_message(embed=embed, view=view)
+        except Exception as e:
+            print(f"Error paging {board} leaderboard: {e}")
 
     @app_commands.command(name="points", description="Check your current point balance")
+    @app_commands.guild_only()
     async def points(self, interaction: discord.Interaction):
         """Check user's point balance"""
         try:
-            points = self.data_manager.get_points(interaction.user.id)
+            points = self.data_manager.get_points(interaction.guild_id, interaction.user.id)
             
             embed = discord.Embed(
                 title="💰 Point Balance",
@@ -22,14 +163,8 @@ class BotCommands(commands.Cog):
             )
             
             # Add leaderboard info
-            leaderboard = self.data_manager.get_points_leaderboard(5)
-            if leaderboard:
-                leaderboard_text = ""
-                for i, (user_id, count) in enumerate(leaderboard):
-                    user = self.bot.get_user(int(user_id))
-                    username = user.name if user else f"User {user_id}"
-                    leaderboard_text += f"{i+1}. {username}: {count} points\n"
-                
+            leaderboard_text = self.render_leaderboard(interaction.guild_id, 'points', 5)
+            if leaderboard_text:
                 embed.add_field(
                     name="🏆 Top 5 Leaderboard",
                     value=leaderboard_text,
@@ -46,10 +181,11 @@ class BotCommands(commands.Cog):
             )
 
     @app_commands.command(name="invites", description="Check your invite count")
+    @app_commands.guild_only()
     async def invites(self, interaction: discord.Interaction):
         """Check user's invite count"""
         try:
-            invite_count = self.data_manager.get_invite_count(interaction.user.id)
+            invite_count = self.data_manager.get_invite_count(interaction.guild_id, interaction.user.id)
             print(f"User {interaction.user.id} invite count: {invite_count}")
             
             embed = discord.Embed(
@@ -59,15 +195,8 @@ class BotCommands(commands.Cog):
             )
             
             # Add leaderboard info
-            leaderboard = self.data_manager.get_invites_leaderboard(5)
-            print(f"Invite leaderboard data: {leaderboard}")
-            if leaderboard:
-                leaderboard_text = ""
-                for i, (user_id, count) in enumerate(leaderboard):
-                    user = self.bot.get_user(int(user_id))
-                    username = user.name if user else f"User {user_id}"
-                    leaderboard_text += f"{i+1}. {username}: {count} invites\n"
-                
+            leaderboard_text = self.render_leaderboard(interaction.guild_id, 'invites', 5)
+            if leaderboard_text:
                 embed.add_field(
                     name="🏆 Top 5 Inviters",
                     value=leaderboard_text,
@@ -85,28 +214,25 @@ class BotCommands(commands.Cog):
 
 
 
-    @app_commands.command(name="inviteboard", description="Display invite leaderboard in tracker channel (Admin only)")
+    @app_commands.command(name="inviteboard", description="Pin an auto-updating invite leaderboard in the tracker channel (Admin only)")
+    @app_commands.guild_only()
     async def inviteboard(self, interaction: discord.Interaction):
-        """Display invite leaderboard in the tracker channel"""
+        """Pin the invite leaderboard in the tracker channel"""
         try:
             # Check if user has admin role
-            has_admin_role = any(role.id == config.ADMIN_ROLE_ID for role in interaction.user.roles)
-            if not has_admin_role:
-                await interaction.response.send_message(
-                    "You don't have permission to use this command.",
-                    ephemeral=True
-                )
+            if not await self.require_admin(interaction):
                 return
 
             # Check if tracker channel is configured
-            if not config.INVITE_TRACKER_CHANNEL_ID:
+            channel_id = self.bot.guild_configs.get(interaction.guild_id).invite_tracker_channel_id
+            if not channel_id:
                 await interaction.response.send_message(
-                    "Invite tracker channel not configured. Set INVITE_TRACKER_CHANNEL_ID in .env",
+                    "Invite tracker channel not configured. Set INVITE_TRACKER_CHANNEL_ID in .env or invite_tracker_channel_id in the guild config",
                     ephemeral=True
                 )
                 return
 
-            channel = self.bot.get_channel(config.INVITE_TRACKER_CHANNEL_ID)
+            channel = self.bot.get_channel(channel_id)
             if not channel:
                 await interaction.response.send_message(
                     "Invite tracker channel not found. Check the channel ID.",
@@ -114,82 +240,144 @@ class BotCommands(commands.Cog):
                 )
                 return
 
-            await interaction.response.send_message(
-                "Posting invite leaderboard to tracker channel...",
-                ephemeral=True
-            )
+            await self.publish_board(interaction, 'invites', channel)
+            
+        except Exception as e:
+            print(f"Error in inviteboard command: {e}")
+            # publish_board answers before pinning, so later errors need a followup
+            send = interaction.followup.send if interaction.response.is_done() else interaction.response.send_message
+            await send("Error posting invite leaderboard. Please try again.", ephemeral=True)
 
-            # Get leaderboard
-            leaderboard = self.data_manager.get_invites_leaderboard(10)
+    @app_commands.command(name="pinboard", description="Pin an auto-updating leaderboard in a channel (Admin only)")
+    @app_commands.describe(board="Leaderboard to pin", channel="Channel to pin it in (defaults to this one)")
+    @app_commands.choices(board=[
+        app_commands.Choice(name="Points", value="points"),
+        app_commands.Choice(name="Invites", value="invites")
+    ])
+    @app_commands.guild_only()
+    async def pinboard(self, interaction: discord.Interaction, board: app_commands.Choice[str],
+                       channel: Optional[discord.TextChannel] = None):
+        """Pin a leaderboard that edits itself when rankings change"""
+        try:
+            if not await self.require_admin(interaction):
+                return
             
-            if not leaderboard:
-                embed = discord.Embed(
-                    title="📊 Invite Leaderboard",
-                    description="No invites tracked yet!",
-                    color=config.EMBED_COLORS['info']
-                )
-            else:
-                embed = discord.Embed(
-                    title="📊 Invite Leaderboard",
-                    description="Top 10 members by invites",
-                    color=config.EMBED_COLORS['success']
+            await self.publish_board(interaction, board.value, channel or interaction.channel)
+            
+        except Exception as e:
+            print(f"Error in pinboard command: {e}")
+            send = interaction.followup.send if interaction.response.is_done() else interaction.response.send_message
+            await send("Error pinning leaderboard. Please try again.", ephemeral=True)
+
+    @app_commands.command(name="invitestats", description="Invite retention: how many invited members stay")
+    @app_commands.describe(member="Inviter to show (defaults to you)")
+    @app_commands.guild_only()
+    async def invitestats(self, interaction: discord.Interaction, member: Optional[discord.Member] = None):
+        """Show an inviter's retention, time-to-leave and churn, plus the best-retaining inviters"""
+        try:
+            target = member or interaction.user
+            tracker = self.bot.invite_tracker
+            stats = await tracker.get_invite_stats(interaction.guild_id, target.id)
+            report = stats['retention']
+            longest = max(report.windows) if report.windows else 0
+            
+            embed = discord.Embed(
+                title=f"📈 Invite Stats for {target.display_name}",
+                description=f"**{stats['total_invites']}** invites ({stats['recent_invites']} in the last {longest} days)",
+                color=config.EMBED_COLORS['info']
+            )
+            embed.add_field(
+                name="🏠 Still here",
+                value=f"{report.retained}/{report.joins} ({format_rate(report.retention)})",
+                inline=True
+            )
+            embed.add_field(
+                name="⏱️ Median time to leave",
+                value=format_duration(report.median_time_to_leave),
+                inline=True
+            )
+            embed.add_field(
+                name=f"🚪 Left within {config.INVITE_EARLY_LEAVE_DAYS:g} days",
+                value=format_rate(report.early_leave_rate),
+                inline=True
+            )
+            for days, (joins, leaves, churn) in report.windows.items():
+                embed.add_field(
+                    name=f"📅 Last {days} days",
+                    value=f"+{joins} / -{leaves}, churn {format_rate(churn)}",
+                    inline=True
                 )
-                
-                leaderboard_text = ""
-                for i, (user_id, invites) in enumerate(leaderboard):
-                    user = self.bot.get_user(int(user_id))
-                    username = user.name if user else f"User {user_id}"
-                    medal = "🥇" if i == 0 else "🥈" if i == 1 else "🥉" if i == 2 else f"{i+1}."
-                    leaderboard_text += f"{medal} {username}: {invites} invites\n"
-                
+            
+            # Server-wide: inviters whose members stay
+            top = tracker.analytics.top_retention(interaction.guild_id)
+            if top:
                 embed.add_field(
-                    name="🏆 Rankings",
-                    value=leaderboard_text,
+                    name="🏆 Best retention",
+                    value="\n".join(
+                        f"{i+1}. <@{entry.inviter_id}>: {format_rate(entry.retention)} of {entry.joins} stayed"
+                        for i, entry in enumerate(top)
+                    ),
                     inline=False
                 )
             
-            embed.timestamp = discord.utils.utcnow()
-            await channel.send(embed=embed)
-            
-            await interaction.followup.send(
-                "Invite leaderboard posted!",
-                ephemeral=True
-            )
+            await interaction.response.send_message(embed=embed, ephemeral=True)
             
         except Exception as e:
-            print(f"Error in inviteboard command: {e}")
+            print(f"Error in invitestats command: {e}")
             await interaction.response.send_message(
-                "Error posting invite leaderboard. Please try again.",
+                "Error retrieving invite stats. Please try again.",
                 ephemeral=True
             )
 
-    @app_commands.command(name="scan", description="Scan all members for verification status (Admin only)")
-    async def scan_members(self, interaction: discord.Interaction):
-        """Scan all members and mute unverified ones"""
+    scan = app_commands.Group(name="scan", description="Verification scan jobs (Admin only)", guild_only=True)
+
+    async def require_admin(self, interaction: discord.Interaction) -> bool:
+        """Reply with a permission error unless the user has the guild's admin role"""
+        admin_role_id = self.bot.guild_configs.get(interaction.guild_id).admin_role_id
+        if self.bot.role_index.has_role(interaction.user, admin_role_id):
+            return True
+        await interaction.response.send_message(
+            "You don't have permission to use this command.",
+            ephemeral=True
+        )
+        return False
+
+    def scan_status_embed(self, guild_id: int, title: str) -> discord.Embed:
+        """Embed with a guild's latest scan job's live counts"""
+        job = self.bot.jobs.get(scan_job(guild_id))
+        progress = self.bot.verification_system.scan_progress.get(guild_id)
+        embed = discord.Embed(
+            title=title,
+            color=config.EMBED_COLORS['info'] if job and job.running else config.EMBED_COLORS['success']
+        )
+        if not job or not progress:
+            embed.description = "No scan has run since the bot started."
+            return embed
+        embed.description = f"Status: **{job.status}**"
+        embed.add_field(name="Processed", value=f"{progress.processed}/{progress.total}", inline=True)
+        embed.add_field(name="Muted", value=str(progress.muted), inline=True)
+        embed.add_field(name="Unmuted", value=str(progress.unmuted), inline=True)
+        embed.add_field(name="Unchanged", value=str(progress.unchanged), inline=True)
+        embed.add_field(name="Errors", value=str(progress.errors), inline=True)
+        embed.add_field(name="Rate", value=f"{progress.rate:.1f}/s over {progress.elapsed:.0f}s", inline=True)
+        return embed
+
+    @scan.command(name="start", description="Scan all members for verification status (Admin only)")
+    async def scan_start(self, interaction: discord.Interaction):
+        """Submit a full scan to the job runner and return immediately"""
         try:
-            # Check if user has admin role
-            has_admin_role = any(role.id == config.ADMIN_ROLE_ID for role in interaction.user.roles)
-            if not has_admin_role:
+            if not await self.require_admin(interaction):
+                return
+
+            if not self.bot.verification_system.start_scan(interaction.guild, full=True):
                 await interaction.response.send_message(
-                    "You don't have permission to use this command.",
+                    embed=self.scan_status_embed(interaction.guild_id, "🔍 A scan is already running"),
                     ephemeral=True
                 )
                 return
 
             await interaction.response.send_message(
-                "Scanning all members for verification status... This may take a moment.",
-                ephemeral=True
-            )
-
-            # Import verification system
-            from verification_system import VerificationSystem
-            verification_system = VerificationSystem(self.bot)
-            
-            # Scan all members
-            await verification_system.scan_all_members()
-            
-            await interaction.followup.send(
-                "Member scan complete! Check console for details.",
+                "Scanning all members for verification status in the background. Use `/scan status` for progress.",
                 ephemeral=True
             )
             
@@ -200,39 +388,52 @@ class BotCommands(commands.Cog):
                 ephemeral=True
             )
 
+    @scan.command(name="status", description="Show verification scan progress (Admin only)")
+    async def scan_status(self, interaction: discord.Interaction):
+        """Show live counts for the current or last scan"""
+        try:
+            if not await self.require_admin(interaction):
+                return
+
+            await interaction.response.send_message(embed=self.scan_status_embed(interaction.guild_id, "🔍 Verification Scan"), ephemeral=True)
+
+        except Exception as e:
+            print(f"Error in scan status command: {e}")
+            await interaction.response.send_message(
+                "Error getting scan status. Please try again.",
+                ephemeral=True
+            )
+
+    @scan.command(name="cancel", description="Cancel the running verification scan (Admin only)")
+    async def scan_cancel(self, interaction: discord.Interaction):
+        """Cancel the running scan, keeping the role changes made so far"""
+        try:
+            if not await self.require_admin(interaction):
+                return
+
+            if not self.bot.verification_system.cancel_scan(interaction.guild_id):
+                await interaction.response.send_message("No scan is running.", ephemeral=True)
+                return
+
+            await interaction.response.send_message(
+                "Scan cancelled. Role changes made so far are kept.",
+                ephemeral=True
+            )
+
+        except Exception as e:
+            print(f"Error in scan cancel command: {e}")
+            await interaction.response.send_message(
+                "Error cancelling scan. Please try again.",
+                ephemeral=True
+            )
+
     @app_commands.command(name="leaderboard", description="View points leaderboard")
+    @app_commands.guild_only()
     async def leaderboard(self, interaction: discord.Interaction):
         """Show points leaderboard"""
         try:
-            leaderboard = self.data_manager.get_points_leaderboard(10)
-            
-            if not leaderboard:
-                embed = discord.Embed(
-                    title="🏆 Points Leaderboard",
-                    description="No points earned yet!",
-                    color=config.EMBED_COLORS['info']
-                )
-            else:
-                embed = discord.Embed(
-                    title="🏆 Points Leaderboard",
-                    description="Top 10 members by points",
-                    color=config.EMBED_COLORS['success']
-                )
-                
-                leaderboard_text = ""
-                for i, (user_id, points) in enumerate(leaderboard):
-                    user = self.bot.get_user(int(user_id))
-                    username = user.name if user else f"User {user_id}"
-                    medal = "🥇" if i == 0 else "🥈" if i == 1 else "🥉" if i == 2 else f"{i+1}."
-                    leaderboard_text += f"{medal} {username}: {points} points\n"
-                
-                embed.add_field(
-                    name="Rankings",
-                    value=leaderboard_text,
-                    inline=False
-                )
-            
-            await interaction.response.send_message(embed=embed)
+            embed, view = self.leaderboard_page(interaction.guild_id, 'points')
+            await interaction.response.send_message(embed=embed, view=view)
             
         except Exception as e:
             print(f"Error in leaderboard command: {e}")
@@ -9,6 +9,9 @@ BOT_TOKEN = os.getenv('DISCORD_TOKEN')
 guild_id_str = os.getenv('GUILD_ID', '1234567890123456789')
 GUILD_ID = int(guild_id_str) if guild_id_str.isdigit() else 1234567890123456789
 
+# Per-guild role/channel overrides for bots in several servers (JSON, guild id -> settings)
+GUILD_CONFIG_FILE = os.getenv('GUILD_CONFIG_FILE', os.path.join('data', 'guild_config.json'))
+
 # Channel IDs (configure these in your .env file)
 VOUCH_CHANNEL_ID = int(os.getenv('VOUCH_CHANNEL_ID', 1234567890123456789))
 # Support multiple order channels - comma-separated IDs
@@ -17,6 +20,25 @@ SUPPORT_CHANNEL_ID = int(os.getenv('SUPPORT_CHANNEL_ID', 1234567890123456789))
 # Invite tracker channel (optional)
 INVITE_TRACKER_CHANNEL_ID = int(os.getenv('INVITE_TRACKER_CHANNEL_ID', 0))
 
+# Joins within this window share one invites fetch for attribution
+INVITE_JOIN_BATCH_SECONDS = float(os.getenv('INVITE_JOIN_BATCH_SECONDS', 1.5))
+# Invites fetches tried for a batch before its joins are given up as unattributed
+INVITE_JOIN_FETCH_ATTEMPTS = int(os.getenv('INVITE_JOIN_FETCH_ATTEMPTS', 3))
+# Invite uses persisted across restarts so joins while offline are still credited
+INVITE_SNAPSHOT_FILE = os.getenv('INVITE_SNAPSHOT_FILE', os.path.join('data', 'invite_snapshot.json'))
+INVITE_SNAPSHOT_SAVE_SECONDS = float(os.getenv('INVITE_SNAPSHOT_SAVE_SECONDS', 10))
+# Tracker channel digests: each guild posts up to INVITE_DIGEST_THRESHOLD joins/leaves per window
+# on their own, then one summary per window (0 seconds posts every event)
+INVITE_DIGEST_SECONDS = float(os.getenv('INVITE_DIGEST_SECONDS', 60))
+INVITE_DIGEST_THRESHOLD = int(os.getenv('INVITE_DIGEST_THRESHOLD', 5))
+# Invite retention analytics (/invitestats), updated as invited members join and leave
+INVITE_ANALYTICS_FILE = os.getenv('INVITE_ANALYTICS_FILE', os.path.join('data', 'invite_analytics.json'))
+INVITE_ANALYTICS_SAVE_SECONDS = float(os.getenv('INVITE_ANALYTICS_SAVE_SECONDS', 30))
+# Rolling churn windows in days (comma-separated)
+INVITE_STATS_WINDOWS_DAYS = [int(d.strip()) for d in os.getenv('INVITE_STATS_WINDOWS_DAYS', '7,30').split(',') if d.strip().isdigit()]
+# Members who leave sooner than this count as early leaves
+INVITE_EARLY_LEAVE_DAYS = float(os.getenv('INVITE_EARLY_LEAVE_DAYS', 7))
+
 # Admin role for unlimited vouches
 ADMIN_ROLE_ID = int(os.getenv('ADMIN_ROLE_ID', 1234567890123456789))
 
@@ -24,6 +46,110 @@ ADMIN_ROLE_ID = int(os.getenv('ADMIN_ROLE_ID', 1234567890123456789))
 VERIFIED_ROLE_ID = int(os.getenv('VERIFIED_ROLE_ID', 1234567890123456789))
 MUTED_ROLE_ID = int(os.getenv('MUTED_ROLE_ID', 1234567890123456789))
 
+# Members with any of these roles skip auto-moderation entirely (comma-separated, defaults to the admin role)
+TRUSTED_ROLE_IDS = [int(id.strip()) for id in os.getenv('TRUSTED_ROLE_IDS', str(ADMIN_ROLE_ID)).split(',') if id.strip() and id.strip().isdigit()]
+TRUST_CACHE_SIZE = int(os.getenv('TRUST_CACHE_SIZE', 10000))
+
+# Verification scan (background job)
+SCAN_CONCURRENCY = int(os.getenv('SCAN_CONCURRENCY', 4))
+# Role edits per second + burst across all scan workers
+SCAN_RATE = float(os.getenv('SCAN_RATE', 5.0))
+SCAN_BURST = int(os.getenv('SCAN_BURST', 10))
+SCAN_PROGRESS_SECONDS = float(os.getenv('SCAN_PROGRESS_SECONDS', 15))
+# Page members in over REST for scans instead of building work lists from the whole member cache
+SCAN_STREAMING = os.getenv('SCAN_STREAMING', 'false').lower() in ('1', 'true', 'yes')
+# Members queued for role changes at once
+SCAN_PAGE_SIZE = int(os.getenv('SCAN_PAGE_SIZE', 1000))
+# Member verified/muted snapshot; startup scans only reconcile members that changed since
+VERIFICATION_SNAPSHOT_FILE = os.getenv('VERIFICATION_SNAPSHOT_FILE', os.path.join('data', 'verification_snapshot.json'))
+VERIFICATION_SNAPSHOT_SAVE_SECONDS = float(os.getenv('VERIFICATION_SNAPSHOT_SAVE_SECONDS', 30))
+
+# Mute/unmute DM notices
+# A notice waits this long so a quick role flip-flop sends nothing
+NOTIFY_COALESCE_SECONDS = float(os.getenv('NOTIFY_COALESCE_SECONDS', 5))
+NOTIFY_DM_RATE = float(os.getenv('NOTIFY_DM_RATE', 1.0))
+NOTIFY_DM_BURST = int(os.getenv('NOTIFY_DM_BURST', 5))
+# Members with closed DMs are not retried for this long
+NOTIFY_DMS_CLOSED_SECONDS = float(os.getenv('NOTIFY_DMS_CLOSED_SECONDS', 86400))
+
+# Moderation rules (JSON, see moderation_rules.json)
+MODERATION_RULES_FILE = os.getenv('MODERATION_RULES_FILE', 'moderation_rules.json')
+
+# Scam domain filtering
+# Optional newline-separated blocklist file merged with the built-in list
+SCAM_DOMAINS_FILE = os.getenv('SCAM_DOMAINS_FILE', '')
+# Optional prebuilt feed prefix (see bloom_filter.py) for very large blocklists
+SCAM_DOMAINS_FEED = os.getenv('SCAM_DOMAINS_FEED', '')
+# Trusted domains that are never treated as scam links (comma-separated)
+ALLOWED_DOMAINS = [d.strip() for d in os.getenv('ALLOWED_DOMAINS', 'discord.com,discord.gg,discordapp.com').split(',') if d.strip()]
+
+# Flood protection (token buckets - rate is messages per second, 0 disables)
+FLOOD_USER_RATE = float(os.getenv('FLOOD_USER_RATE', 1.0))
+FLOOD_USER_BURST = int(os.getenv('FLOOD_USER_BURST', 8))
+FLOOD_CHANNEL_RATE = float(os.getenv('FLOOD_CHANNEL_RATE', 10.0))
+FLOOD_CHANNEL_BURST = int(os.getenv('FLOOD_CHANNEL_BURST', 40))
+# Actions: delete, timeout, ban, log (comma-separated)
+FLOOD_USER_ACTIONS = [a.strip() for a in os.getenv('FLOOD_USER_ACTIONS', 'delete,timeout,log').split(',') if a.strip()]
+FLOOD_CHANNEL_ACTIONS = [a.strip() for a in os.getenv('FLOOD_CHANNEL_ACTIONS', 'delete').split(',') if a.strip()]
+FLOOD_TIMEOUT_MINUTES = int(os.getenv('FLOOD_TIMEOUT_MINUTES', 10))
+
+# Duplicate message detection (same text across channels/users in a window)
+DUPLICATE_WINDOW_SECONDS = float(os.getenv('DUPLICATE_WINDOW_SECONDS', 30))
+DUPLICATE_CHANNEL_THRESHOLD = int(os.getenv('DUPLICATE_CHANNEL_THRESHOLD', 3))
+DUPLICATE_GLOBAL_THRESHOLD = int(os.getenv('DUPLICATE_GLOBAL_THRESHOLD', 8))
+DUPLICATE_MIN_LENGTH = int(os.getenv('DUPLICATE_MIN_LENGTH', 12))
+# 'exact' (normalized text hash) or 'simhash' (near-duplicates)
+DUPLICATE_MODE = os.getenv('DUPLICATE_MODE', 'exact')
+DUPLICATE_ACTIONS = [a.strip() for a in os.getenv('DUPLICATE_ACTIONS', 'delete,timeout,log').split(',') if a.strip()]
+# The same text from many different users is often harmless ("happy birthday!", "gg"), so by default it is only logged
+DUPLICATE_GLOBAL_ACTIONS = [a.strip() for a in os.getenv('DUPLICATE_GLOBAL_ACTIONS', 'log').split(',') if a.strip()]
+
+# Order/support channel reminder DMs are sent at most once per user per quiet period
+NOTICE_QUIET_SECONDS = float(os.getenv('NOTICE_QUIET_SECONDS', 300))
+NOTICE_CACHE_SIZE = int(os.getenv('NOTICE_CACHE_SIZE', 10000))
+
+# Moderation audit log (tab-separated lines, rotated by size; empty disables)
+AUDIT_LOG_FILE = os.getenv('AUDIT_LOG_FILE', os.path.join('data', 'audit.log'))
+AUDIT_LOG_MAX_BYTES = int(os.getenv('AUDIT_LOG_MAX_BYTES', 10 * 1024 * 1024))
+AUDIT_LOG_BACKUPS = int(os.getenv('AUDIT_LOG_BACKUPS', 5))
+AUDIT_LOG_FLUSH_SECONDS = float(os.getenv('AUDIT_LOG_FLUSH_SECONDS', 2.0))
+
+# Moderation action dispatcher pacing (calls per second and burst per route)
+DISPATCH_BAN_RATE = float(os.getenv('DISPATCH_BAN_RATE', 2.0))
+DISPATCH_BAN_BURST = int(os.getenv('DISPATCH_BAN_BURST', 5))
+DISPATCH_TIMEOUT_RATE = float(os.getenv('DISPATCH_TIMEOUT_RATE', 2.0))
+DISPATCH_TIMEOUT_BURST = int(os.getenv('DISPATCH_TIMEOUT_BURST', 5))
+DISPATCH_DELETE_RATE = float(os.getenv('DISPATCH_DELETE_RATE', 1.0))
+DISPATCH_DELETE_BURST = int(os.getenv('DISPATCH_DELETE_BURST', 5))
+DISPATCH_DM_RATE = float(os.getenv('DISPATCH_DM_RATE', 1.0))
+DISPATCH_DM_BURST = int(os.getenv('DISPATCH_DM_BURST', 3))
+# Shared budget across all moderation calls (Discord's global limit is 50/s)
+DISPATCH_GLOBAL_RATE = float(os.getenv('DISPATCH_GLOBAL_RATE', 10.0))
+DISPATCH_GLOBAL_BURST = int(os.getenv('DISPATCH_GLOBAL_BURST', 20))
+# Deletes arriving within this window are bulk-deleted together
+DISPATCH_BATCH_SECONDS = float(os.getenv('DISPATCH_BATCH_SECONDS', 0.5))
+# Repeated bans/timeouts for the same user within this window are dropped
+DISPATCH_DEDUPE_SECONDS = float(os.getenv('DISPATCH_DEDUPE_SECONDS', 60))
+# On shutdown, queued actions get this long to run before the rest are dropped
+DISPATCH_DRAIN_SECONDS = float(os.getenv('DISPATCH_DRAIN_SECONDS', 5))
+
+# Rendered leaderboards are reused until a score change could alter them, or for at most this long
+LEADERBOARD_CACHE_SECONDS = float(os.getenv('LEADERBOARD_CACHE_SECONDS', 300))
+# Rows per /leaderboard and /inviteboard page
+LEADERBOARD_PAGE_SIZE = int(os.getenv('LEADERBOARD_PAGE_SIZE', 10))
+# Pinned leaderboards (/inviteboard, /pinboard) are re-checked this often and edited only when they change (0 disables)
+LEADERBOARD_REFRESH_SECONDS = float(os.getenv('LEADERBOARD_REFRESH_SECONDS', 300))
+PINNED_LEADERBOARDS_FILE = os.getenv('PINNED_LEADERBOARDS_FILE', os.path.join('data', 'pinned_leaderboards.json'))
+
+# Display names for leaderboards, kept across restarts and refreshed in the background
+NAME_CACHE_FILE = os.getenv('NAME_CACHE_FILE', os.path.join('data', 'user_names.json'))
+NAME_CACHE_SAVE_SECONDS = float(os.getenv('NAME_CACHE_SAVE_SECONDS', 30))
+# Names older than this are re-fetched the next time they are shown
+NAME_CACHE_TTL_SECONDS = float(os.getenv('NAME_CACHE_TTL_SECONDS', 7 * 86400))
+# REST lookups (users no longer in the server) per second + burst
+NAME_FETCH_RATE = float(os.getenv('NAME_FETCH_RATE', 2.0))
+NAME_FETCH_BURST = int(os.getenv('NAME_FETCH_BURST', 5))
+
 # Cooldown Settings
 VOUCH_COOLDOWN_HOURS = 5
 
@@ -2,8 +2,10 @@ import json
 import os
 import aiofiles
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 import config
+from leaderboard_cache import LeaderboardCache
+from leaderboard_index import RankedBoard
 
 class DataManager:
     def __init__(self):
@@ -11,6 +13,10 @@ class DataManager:
         self.points_file = os.path.join(self.data_dir, "points.json")
         self.invites_file = os.path.join(self.data_dir, "invites.json")
         self.cooldowns_file = os.path.join(self.data_dir, "cooldowns.json")
+        # Rendered leaderboards, dropped when a score change could alter them
+        self.leaderboard_cache = LeaderboardCache()
+        # (guild id, board) -> rank-ordered scores, built on first leaderboard query
+        self.rankings: Dict[Tuple[int, str], RankedBoard] = {}
         self.ensure_data_dir()
         self.load_data()
 
@@ -21,9 +27,23 @@ class DataManager:
 
     def load_data(self):
         """Load all data files"""
-        self.points = self.load_json(self.points_file, {})
-        self.invites = self.load_json(self.invites_file, {})
-        self.cooldowns = self.load_json(self.cooldowns_file, {})
+        # Each file maps guild id -> that guild's data
+        self.points = self.partition_legacy(self.points_file, self.load_json(self.points_file, {}))
+        self.invites = self.partition_legacy(self.invites_file, self.load_json(self.invites_file, {}))
+        self.cooldowns = self.partition_legacy(self.cooldowns_file, self.load_json(self.cooldowns_file, {}))
+
+    def partition_legacy(self, filepath: str, data: Dict) -> Dict:
+        """Move data saved before guild partitioning under GUILD_ID"""
+        # Old files keyed users (and 'relationships') at the top level
+        if data and any(key == 'relationships' or not isinstance(value, dict) for key, value in data.items()):
+            print(f"Moving {filepath} data under guild {config.GUILD_ID}")
+            return {str(config.GUILD_ID): data}
+        return data
+
+    @staticmethod
+    def guild_data(data: Dict, guild_id: int) -> Dict:
+        """One guild's partition of a data file (a new empty one if missing)"""
+        return data.setdefault(str(guild_id), {})
 
     def load_json(self, filepath: str, default: Dict) -> Dict:
         """Load JSON file with error handling"""
@@ -44,110 +64,128 @@ class DataManager:
             print(f"Error saving to {filepath}: {e}")
 
     # Point System Methods
-    def get_points(self, user_id: int) -> int:
+    def get_points(self, guild_id: int, user_id: int) -> int:
         """Get user's point balance"""
-        return self.points.get(str(user_id), 0)
+        return self.points.get(str(guild_id), {}).get(str(user_id), 0)
 
-    async def add_points(self, user_id: int, points: int = 1):
+    async def add_points(self, guild_id: int, user_id: int, points: int = 1):
         """Add points to user"""
         user_id_str = str(user_id)
-        current_points = self.points.get(user_id_str, 0)
-        self.points[user_id_str] = current_points + points
+        guild_points = self.guild_data(self.points, guild_id)
+        current_points = guild_points.get(user_id_str, 0)
+        guild_points[user_id_str] = current_points + points
+        self.score_changed(guild_id, 'points', user_id_str, guild_points[user_id_str])
         await self.save_json(self.points_file, self.points)
 
     # Invite Tracking Methods
-    def get_invite_count(self, user_id: int) -> int:
+    def get_invite_count(self, guild_id: int, user_id: int) -> int:
         """Get user's invite count"""
         user_id_str = str(user_id)
-        count = self.invites.get(user_id_str, 0)
-        print(f"Getting invite count for {user_id_str}: {count}")
-        print(f"Current invites data: {self.invites}")
-        return count
+        guild_invites = self.invites.get(str(guild_id), {})
+        return guild_invites.get(user_id_str, 0)
 
-    async def add_invite(self, inviter_id: int, invitee_id: int):
-        """Record an invite"""
+    async def add_invite(self, guild_id: int, inviter_id: int, invitee_id: int, joined_at: Optional[float] = None):
+        """Record an invite (`joined_at` is a unix timestamp, defaulting to now)"""
         inviter_id_str = str(inviter_id)
         invitee_id_str = str(invitee_id)
+        guild_invites = self.guild_data(self.invites, guild_id)
         
         # Increment inviter's count
-        current_invites = self.invites.get(inviter_id_str, 0)
-        self.invites[inviter_id_str] = current_invites + 1
+        current_invites = guild_invites.get(inviter_id_str, 0)
+        guild_invites[inviter_id_str] = current_invites + 1
+        self.score_changed(guild_id, 'invites', inviter_id_str, guild_invites[inviter_id_str])
         
-        print(f"Adding invite: inviter={inviter_id_str}, invitee={invitee_id_str}")
-        print(f"Current invites data: {self.invites}")
-        
-        # Store invite relationship
-        if 'relationships' not in self.invites:
-            self.invites['relationships'] = {}
-        self.invites['relationships'][invitee_id_str] = inviter_id_str
+        # Store invite relationship with the join time for retention stats
+        if 'relationships' not in guild_invites:
+            guild_invites['relationships'] = {}
+        guild_invites['relationships'][invitee_id_str] = {
+            'inviter': inviter_id_str,
+            'joined_at': datetime.now().timestamp() if joined_at is None else joined_at
+        }
         
         await self.save_json(self.invites_file, self.invites)
 
-    async def remove_invite(self, inviter_id: int, invitee_id: int):
-        """Remove an invite (when member leaves)"""
+    async def remove_invite(self, guild_id: int, inviter_id: int, invitee_id: int) -> Optional[float]:
+        """Remove an invite (when member leaves), returning when they joined if known"""
         inviter_id_str = str(inviter_id)
         invitee_id_str = str(invitee_id)
+        guild_invites = self.guild_data(self.invites, guild_id)
         
         # Decrement inviter's count
-        current_invites = self.invites.get(inviter_id_str, 0)
+        current_invites = guild_invites.get(inviter_id_str, 0)
         if current_invites > 0:
-            self.invites[inviter_id_str] = current_invites - 1
+            guild_invites[inviter_id_str] = current_invites - 1
+            self.score_changed(guild_id, 'invites', inviter_id_str, guild_invites[inviter_id_str])
         
         # Remove invite relationship
-        if 'relationships' in self.invites and invitee_id_str in self.invites['relationships']:
-            del self.invites['relationships'][invitee_id_str]
-        
-        print(f"Removing invite: inviter={inviter_id_str}, invitee={invitee_id_str}")
-        print(f"Updated invites data: {self.invites}")
+        joined_at = None
+        if 'relationships' in guild_invites and invitee_id_str in guild_invites['relationships']:
+            relationship = guild_invites['relationships'].pop(invitee_id_str)
+            if isinstance(relationship, dict):
+                joined_at = relationship.get('joined_at')
         
         await self.save_json(self.invites_file, self.invites)
+        return joined_at
 
-    def get_inviter(self, user_id: int) -> Optional[int]:
+    def get_inviter(self, guild_id: int, user_id: int) -> Optional[int]:
         """Get who invited a user"""
-        relationships = self.invites.get('relationships', {})
-        inviter_id_str = relationships.get(str(user_id))
+        relationships = self.invites.get(str(guild_id), {}).get('relationships', {})
+        relationship = relationships.get(str(user_id))
+        # Relationships saved before join times were kept are just the inviter id
+        inviter_id_str = relationship.get('inviter') if isinstance(relationship, dict) else relationship
         return int(inviter_id_str) if inviter_id_str else None
 
     # Cooldown Methods
-    def is_on_cooldown(self, user_id: int) -> bool:
+    def is_on_cooldown(self, guild_id: int, user_id: int) -> bool:
         """Check if user is on vouch cooldown"""
         user_id_str = str(user_id)
-        if user_id_str not in self.cooldowns:
+        guild_cooldowns = self.cooldowns.get(str(guild_id), {})
+        if user_id_str not in guild_cooldowns:
             return False
         
-        last_vouch = datetime.fromisoformat(self.cooldowns[user_id_str])
+        last_vouch = datetime.fromisoformat(guild_cooldowns[user_id_str])
         cooldown_duration = timedelta(hours=config.VOUCH_COOLDOWN_HOURS)
         return datetime.now() - last_vouch < cooldown_duration
 
-    async def set_cooldown(self, user_id: int):
+    async def set_cooldown(self, guild_id: int, user_id: int):
         """Set vouch cooldown for user"""
         user_id_str = str(user_id)
-        self.cooldowns[user_id_str] = datetime.now().isoformat()
+        self.guild_data(self.cooldowns, guild_id)[user_id_str] = datetime.now().isoformat()
         await self.save_json(self.cooldowns_file, self.cooldowns)
 
-    def get_cooldown_remaining(self, user_id: int) -> Optional[timedelta]:
+    def get_cooldown_remaining(self, guild_id: int, user_id: int) -> Optional[timedelta]:
         """Get remaining cooldown time"""
         user_id_str = str(user_id)
-        if user_id_str not in self.cooldowns:
+        guild_cooldowns = self.cooldowns.get(str(guild_id), {})
+        if user_id_str not in guild_cooldowns:
             return None
         
-        last_vouch = datetime.fromisoformat(self.cooldowns[user_id_str])
+        last_vouch = datetime.fromisoformat(guild_cooldowns[user_id_str])
         cooldown_duration = timedelta(hours=config.VOUCH_COOLDOWN_HOURS)
         remaining = cooldown_duration - (datetime.now() - last_vouch)
         return remaining if remaining.total_seconds() > 0 else None
 
     # Leaderboard Methods
-    def get_points_leaderboard(self, limit: int = 10) -> list:
+    def ranking(self, guild_id: int, board: str) -> RankedBoard:
+        """The 'points' or 'invites' board for a guild in rank order"""
+        ranking = self.rankings.get((guild_id, board))
+        if ranking is None:
+            data = self.points if board == 'points' else self.invites
+            scores = ((user_id, score) for user_id, score in data.get(str(guild_id), {}).items() if user_id != 'relationships')
+            ranking = self.rankings[(guild_id, board)] = RankedBoard(scores)
+        return ranking
+
+    def score_changed(self, guild_id: int, board: str, user_id_str: str, score: int):
+        """Keep the board's ranking and cached renders in step with a new score"""
+        ranking = self.rankings.get((guild_id, board))
+        if ranking is not None:
+            ranking.update(int(user_id_str), score)
+        self.leaderboard_cache.changed(guild_id, board, user_id_str, score)
+
+    def get_points_leaderboard(self, guild_id: int, limit: int = 10) -> list:
         """Get top users by points"""
-        sorted_users = sorted(self.points.items(), key=lambda x: x[1], reverse=True)
-        return sorted_users[:limit]
+        return self.ranking(guild_id, 'points').page(0, limit)
 
-    def get_invites_leaderboard(self, limit: int = 10) -> list:
+    def get_invites_leaderboard(self, guild_id: int, limit: int = 10) -> list:
         """Get top users by invites"""
-        print(f"Getting invite leaderboard. Raw invites data: {self.invites}")
-        # Filter out relationships from invite data
-        invite_counts = {k: v for k, v in self.invites.items() if k != 'relationships'}
-        print(f"Filtered invite counts: {invite_counts}")
-        sorted_users = sorted(invite_counts.items(), key=lambda x: x[1], reverse=True)
-        print(f"Sorted users: {sorted_users}")
-        return sorted_users[:limit] 
\ No newline at end of file
+        return self.ranking(guild_id, 'invites').page(0, limit)
@@ -0,0 +1,160 @@
+import re
+from typing import Iterable, Iterator, List, Optional
+
+from text_normalizer import fold_confusables
+
+# Characters that can never be part of a hostname in chat text. Markdown
+# decoration (`**`, `__`, `~~`, `||`, backticks) and brackets are excluded so
+# `**scam.com**` or `<https://scam.com>` still yield a clean host.
+_HOST_CHARS = r'[^\s/?#@:<>()\[\]{}"\'`*_~|\\.,;!\u3002\uff0e\uff61]'
+# ASCII dot plus the ideographic/fullwidth dots IDNA treats as separators
+_DOT = r'[.\u3002\uff0e\uff61]'
+
+# Hosts only start at a token boundary (after whitespace, `//`, `@`, markdown
+# or brackets), which keeps the scan linear in the message length. Scheme and
+# userinfo are never captured since `:`, `/` and `@` are not host characters.
+HOST_PATTERN = re.compile(
+    r'(?<!' + _HOST_CHARS + r')'
+    r'((?:' + _HOST_CHARS + r'+' + _DOT + r')+' + _HOST_CHARS + r'+)' + _DOT + r'?',
+    re.IGNORECASE
+)
+_DOT_PATTERN = re.compile(_DOT)
+
+_TERMINAL = ''
+
+
+def normalize_host(host: str) -> Optional[str]:
+    """Lowercase, strip root dots and IDNA-encode a hostname"""
+    if host.isascii():
+        # Already in ASCII-compatible form, skip the (slow) IDNA codec
+        return host.strip('.').lower() or None
+    host = _DOT_PATTERN.sub('.', host).strip('.').lower()
+    if not host:
+        return None
+    try:
+        host = host.encode('idna').decode('ascii')
+    except UnicodeError:
+        # Labels that are too long or otherwise invalid - keep the raw form
+        pass
+    return host
+
+
+def extract_hosts(content: str) -> Iterator[str]:
+    """Yield every normalized hostname found in a message"""
+    if '.' not in content and (content.isascii() or not _DOT_PATTERN.search(content)):
+        return
+    # Lookalike letters (`pаypal.com` with a Cyrillic а) resolve to the Latin host
+    content = fold_confusables(content)
+    for match in HOST_PATTERN.finditer(content):
+        # `user.name@host` - the part before `@` is userinfo, not a host
+        if content[match.end():match.end() + 1] == '@':
+            continue
+        host = normalize_host(match.group(1))
+        if host:
+            yield host
+
+
+class DomainTrie:
+    """Suffix trie over reversed domain labels.
+
+    Adding `scam.com` blocks `scam.com` and every subdomain of it, but not
+    `notscam.com`. Lookups cost O(labels) per host.
+    """
+
+    def __init__(self, domains: Iterable[str] = ()):
+        self.root = {}
+        self.size = 0
+        for domain in domains:
+            self.add(domain)
+
+    def add(self, domain: str):
+        """Add a domain (and implicitly all its subdomains)"""
+        domain = normalize_host(domain)
+        if not domain:
+            return
+        node = self.root
+        for label in reversed(domain.split('.')):
+            node = node.setdefault(label, {})
+        if _TERMINAL not in node:
+            node[_TERMINAL] = domain
+            self.size += 1
+
+    def match(self, host: str) -> Optional[str]:
+        """Return the most specific listed suffix of `host`, if any"""
+        node = self.root
+        matched = None
+        for label in reversed(host.split('.')):
+            node = node.get(label)
+            if node is None:
+                break
+            if _TERMINAL in node:
+                matched = node[_TERMINAL]
+        return matched
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, host: str) -> bool:
+        return self.match(host) is not None
+
+
+class DomainMatcher:
+    """Blocklist lookup with an allowlist layer for trusted domains.
+
+    Small lists live in an in-memory trie; large threat-intel feeds can be
+    attached as on-disk feeds (see bloom_filter.DomainFeed) that expose the
+    same `match(host)` interface.
+    """
+
+    def __init__(self, blocked: Iterable[str] = (), allowed: Iterable[str] = ()):
+        self.blocked = DomainTrie(blocked)
+        self.allowed = DomainTrie(allowed)
+        self.feeds = []
+
+    def add_feed(self, feed):
+        """Attach an external blocklist feed checked after the trie"""
+        self.feeds.append(feed)
+
+    def add_blocked(self, domains: Iterable[str]):
+        """Extend the blocklist"""
+        for domain in domains:
+            self.blocked.add(domain)
+
+    def check_host(self, host: str) -> Optional[str]:
+        """Return the blocked suffix matching a normalized host, if any"""
+        blocked = self.blocked.match(host)
+        if blocked is None:
+            for feed in self.feeds:
+                blocked = feed.match(host)
+                if blocked is not None:
+                    break
+            else:
+                return None
+        allowed = self.allowed.match(host)
+        # The more specific entry wins, ties go to the allowlist
+        if allowed is not None and allowed.count('.') >= blocked.count('.'):
+            return None
+        return blocked
+
+    def find_blocked(self, content: str) -> Optional[str]:
+        """Return the first blocked domain referenced in a message"""
+        for host in extract_hosts(content):
+            blocked = self.check_host(host)
+            if blocked:
+                return blocked
+        return None
+
+    def find_all_blocked(self, content: str) -> List[str]:
+        """Return every blocked domain referenced in a message"""
+        return [blocked for blocked in map(self.check_host, extract_hosts(content)) if blocked]
+
+
+def load_domain_file(path: str) -> List[str]:
+    """Load a newline-separated domain list, ignoring blanks and # comments"""
+    domains = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                domains.append(line)
+    return domains
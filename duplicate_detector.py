@@ -0,0 +1,190 @@
+import hashlib
+import re
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Hashable, List, NamedTuple, Optional, Tuple
+
+from text_normalizer import normalize_content
+
+_WHITESPACE = re.compile(r'\s+')
+_WORD = re.compile(r'\w+')
+# Spam links usually carry a randomized path; keep only scheme and host
+_URL_PATH = re.compile(r'(\w+://[^/\s]+)\S*')
+
+SIMHASH_BITS = 64
+# Eight 8-bit bands: two hashes within 7 bits share at least one band
+SIMHASH_BANDS = 8
+SIMHASH_BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+
+
+class Post(NamedTuple):
+    timestamp: float
+    user_id: int
+    channel_id: int
+    message_id: int
+
+
+class DuplicateHit(NamedTuple):
+    """A burst of duplicate posts; `posts` excludes the triggering message"""
+    scope: str
+    fingerprint: Hashable
+    posts: List[Post]
+
+
+def canonical_text(content: str, normalized: Optional[str] = None) -> str:
+    """Normalized, case-folded, whitespace-collapsed message text"""
+    if normalized is None:
+        normalized = normalize_content(content)
+    return _WHITESPACE.sub(' ', normalized).strip().casefold()
+
+
+def exact_fingerprint(text: str) -> int:
+    """64-bit hash of canonical text"""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def simhash(text: str) -> int:
+    """64-bit simhash over words and word bigrams, ignoring URL paths"""
+    words = _WORD.findall(_URL_PATH.sub(r'\1', text))
+    shingles = words + [' '.join(words[i:i + 2]) for i in range(len(words) - 1)] or [text]
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        value = exact_fingerprint(shingle)
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    result = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            result |= 1 << bit
+    return result
+
+
+class _Window:
+    """Posts per key inside a sliding time window, bounded in keys and posts.
+
+    Keys are kept in last-use order in an OrderedDict so expired keys are
+    popped from the front; posts per key are a deque pruned from the left.
+    Both are amortized O(1) per recorded post.
+    """
+
+    def __init__(self, window_seconds: float, max_keys: int, max_posts: int):
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self.max_posts = max_posts
+        self.entries: 'OrderedDict[Hashable, Deque[Post]]' = OrderedDict()
+
+    def add(self, key: Hashable, post: Post) -> Deque[Post]:
+        posts = self.entries.get(key)
+        if posts is None:
+            posts = self.entries[key] = deque(maxlen=self.max_posts)
+        else:
+            self.entries.move_to_end(key)
+        posts.append(post)
+
+        cutoff = post.timestamp - self.window_seconds
+        while posts and posts[0].timestamp < cutoff:
+            posts.popleft()
+        self.evict(cutoff)
+        return posts
+
+    def evict(self, cutoff: float):
+        entries = self.entries
+        while entries:
+            key = next(iter(entries))
+            if len(entries) <= self.max_keys and entries[key][-1].timestamp >= cutoff:
+                break
+            entries.popitem(last=False)
+
+    def discard(self, key: Hashable):
+        self.entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class DuplicateDetector:
+    """Detects the same (or nearly the same) text posted repeatedly.
+
+    Triggers when one user posts a fingerprint in `channel_threshold`
+    distinct channels, or when `global_threshold` posts from any users in one
+    guild share a fingerprint, within `window_seconds`.
+    """
+
+    def __init__(self, window_seconds: float = 30.0, channel_threshold: int = 3,
+                 global_threshold: int = 8, min_length: int = 12, mode: str = 'exact',
+                 simhash_distance: int = 6, max_keys: int = 50000, clock=time.monotonic):
+        self.window_seconds = window_seconds
+        self.channel_threshold = channel_threshold
+        self.global_threshold = global_threshold
+        self.min_length = min_length
+        self.mode = mode
+        self.simhash_distance = simhash_distance
+        self.clock = clock
+        max_posts = max(channel_threshold, global_threshold) * 2
+        self.user_window = _Window(window_seconds, max_keys, max_posts)
+        self.global_window = _Window(window_seconds, max_keys, max_posts)
+        # (band index, band value) -> (canonical simhash, last seen), in last-use order
+        self.bands: 'OrderedDict[Tuple[int, int], Tuple[int, float]]' = OrderedDict()
+        self.max_keys = max_keys
+
+    def fingerprint(self, content: str, now: float, normalized: Optional[str] = None) -> Optional[int]:
+        """Fingerprint a message, or None if it is too short to judge"""
+        text = canonical_text(content, normalized)
+        if len(text) < self.min_length:
+            return None
+        if self.mode != 'simhash':
+            return exact_fingerprint(text)
+        return self.canonical_simhash(simhash(text), now)
+
+    def canonical_simhash(self, value: int, now: float) -> int:
+        """Map a simhash onto a recently seen near-identical one, if any"""
+        mask = (1 << SIMHASH_BAND_BITS) - 1
+        keys = [(band, value >> (band * SIMHASH_BAND_BITS) & mask) for band in range(SIMHASH_BANDS)]
+        cutoff = now - self.window_seconds
+
+        canonical = value
+        for key in keys:
+            entry = self.bands.get(key)
+            if entry and entry[1] >= cutoff and bin(entry[0] ^ value).count('1') <= self.simhash_distance:
+                canonical = entry[0]
+                break
+
+        bands = self.bands
+        for key in keys:
+            bands[key] = (canonical, now)
+            bands.move_to_end(key)
+        while bands:
+            oldest = next(iter(bands))
+            if len(bands) <= self.max_keys * SIMHASH_BANDS and bands[oldest][1] >= cutoff:
+                break
+            bands.popitem(last=False)
+        return canonical
+
+    def record(self, user_id: int, channel_id: int, message_id: int, content: str,
+               now: Optional[float] = None, normalized: Optional[str] = None,
+               guild_id: Optional[int] = None) -> Optional[DuplicateHit]:
+        """Record a message and report a duplicate burst if it completes one.
+
+        Pass `normalized` when the caller already ran normalize_content.
+        Global bursts are counted per `guild_id`, so text repeated in other
+        guilds never counts against this one.
+        """
+        if now is None:
+            now = self.clock()
+        fingerprint = self.fingerprint(content, now, normalized)
+        if fingerprint is None:
+            return None
+
+        post = Post(now, user_id, channel_id, message_id)
+
+        user_posts = self.user_window.add((user_id, fingerprint), post)
+        if len({p.channel_id for p in user_posts}) >= self.channel_threshold:
+            self.user_window.discard((user_id, fingerprint))
+            return DuplicateHit('user', fingerprint, list(user_posts)[:-1])
+
+        global_posts = self.global_window.add((guild_id, fingerprint), post)
+        if len(global_posts) >= self.global_threshold:
+            self.global_window.discard((guild_id, fingerprint))
+            return DuplicateHit('global', fingerprint, list(global_posts)[:-1])
+
+        return None
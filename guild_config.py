@@ -0,0 +1,82 @@
+import json
+from dataclasses import dataclass, fields, replace
+from typing import Dict, FrozenSet
+
+import config
+
+
+@dataclass(frozen=True)
+class GuildConfig:
+    """Role and channel settings for one guild"""
+    guild_id: int
+    admin_role_id: int
+    verified_role_id: int
+    muted_role_id: int
+    trusted_role_ids: FrozenSet[int]
+    vouch_channel_id: int
+    invite_tracker_channel_id: int
+
+
+# Keys a guild entry in GUILD_CONFIG_FILE may override
+GUILD_SETTINGS = frozenset(f.name for f in fields(GuildConfig)) - {'guild_id'}
+
+
+class GuildConfigStore:
+    """Per-guild settings from GUILD_CONFIG_FILE, falling back to the .env values.
+
+    The file maps guild ids to the settings that differ for that guild:
+
+        {"123": {"verified_role_id": 456, "vouch_channel_id": 789}}
+
+    Channel-scoped moderation rules don't need an entry here - channel ids
+    are unique across guilds, so moderation_rules.json lists them directly.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = config.GUILD_CONFIG_FILE if path is None else path
+        self.overrides: Dict[int, Dict] = {}
+        self.configs: Dict[int, GuildConfig] = {}
+        self.load()
+
+    def load(self):
+        """(Re)read the guild settings file"""
+        self.overrides = {}
+        self.configs = {}
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (json.JSONDecodeError, ValueError) as e:
+            print(f"Ignoring unreadable guild config {self.path}: {e}")
+            return
+
+        for guild_id, settings in data.items():
+            unknown = set(settings) - GUILD_SETTINGS
+            if unknown:
+                print(f"Guild {guild_id}: ignoring unknown settings {sorted(unknown)}")
+            self.overrides[int(guild_id)] = {key: value for key, value in settings.items() if key in GUILD_SETTINGS}
+
+    @staticmethod
+    def defaults(guild_id: int) -> GuildConfig:
+        return GuildConfig(
+            guild_id=guild_id,
+            admin_role_id=config.ADMIN_ROLE_ID,
+            verified_role_id=config.VERIFIED_ROLE_ID,
+            muted_role_id=config.MUTED_ROLE_ID,
+            trusted_role_ids=frozenset(config.TRUSTED_ROLE_IDS),
+            vouch_channel_id=config.VOUCH_CHANNEL_ID,
+            invite_tracker_channel_id=config.INVITE_TRACKER_CHANNEL_ID
+        )
+
+    def get(self, guild_id: int) -> GuildConfig:
+        """A guild's settings, built once per guild"""
+        guild_config = self.configs.get(guild_id)
+        if guild_config is None:
+            overrides = dict(self.overrides.get(guild_id, {}))
+            if 'trusted_role_ids' in overrides:
+                overrides['trusted_role_ids'] = frozenset(int(role_id) for role_id in overrides['trusted_role_ids'])
+            guild_config = self.configs[guild_id] = replace(self.defaults(guild_id), **overrides)
+        return guild_config
@@ -0,0 +1,232 @@
+import asyncio
+import json
+import math
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import aiofiles
+import config
+
+DAY = 86400
+# Time-to-leave histogram resolution: buckets per doubling of the duration
+BUCKETS_PER_OCTAVE = 4
+
+
+def duration_bucket(seconds: float) -> int:
+    return int(BUCKETS_PER_OCTAVE * math.log2(1 + max(0.0, seconds)))
+
+
+def bucket_midpoint(bucket: int) -> float:
+    """Representative duration for a histogram bucket (geometric middle)"""
+    return 2 ** ((bucket + 0.5) / BUCKETS_PER_OCTAVE) - 1
+
+
+def format_duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "n/a"
+    if seconds >= DAY:
+        return f"{seconds / DAY:.1f}d"
+    if seconds >= 3600:
+        return f"{seconds / 3600:.1f}h"
+    return f"{seconds / 60:.0f}m"
+
+
+def format_rate(rate: Optional[float]) -> str:
+    return "n/a" if rate is None else f"{rate:.0%}"
+
+
+@dataclass
+class InviterStats:
+    """Running totals for one inviter; each join or leave does a bounded amount of work"""
+    joins: int = 0
+    leaves: int = 0
+    # Left within INVITE_EARLY_LEAVE_DAYS of joining
+    early_leaves: int = 0
+    # duration bucket -> leaves (see duration_bucket)
+    time_to_leave: Dict[int, int] = field(default_factory=dict)
+    # day number -> [joins, leaves], kept for the longest rolling window only
+    days: Dict[int, List[int]] = field(default_factory=dict)
+
+    @property
+    def retained(self) -> int:
+        # Leaves of members invited before analytics existed can outnumber joins
+        return max(0, self.joins - self.leaves)
+
+    def median_time_to_leave(self) -> Optional[float]:
+        samples = sum(self.time_to_leave.values())
+        if not samples:
+            return None
+        seen = 0
+        for bucket in sorted(self.time_to_leave):
+            seen += self.time_to_leave[bucket]
+            if seen * 2 >= samples:
+                return bucket_midpoint(bucket)
+
+    def window(self, today: int, days: int) -> Tuple[int, int]:
+        """(joins, leaves) over the last `days` days including today"""
+        joins = leaves = 0
+        for day, (day_joins, day_leaves) in self.days.items():
+            if today - day < days:
+                joins += day_joins
+                leaves += day_leaves
+        return joins, leaves
+
+    def to_dict(self) -> Dict:
+        return {'joins': self.joins, 'leaves': self.leaves, 'early': self.early_leaves,
+                'ttl': self.time_to_leave, 'days': self.days}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'InviterStats':
+        return cls(
+            joins=data.get('joins', 0),
+            leaves=data.get('leaves', 0),
+            early_leaves=data.get('early', 0),
+            time_to_leave={int(bucket): count for bucket, count in data.get('ttl', {}).items()},
+            days={int(day): counts for day, counts in data.get('days', {}).items()}
+        )
+
+
+class InviterReport(NamedTuple):
+    inviter_id: int
+    joins: int
+    leaves: int
+    retained: int
+    # Share of credited joins still in the server (None before any joins)
+    retention: Optional[float]
+    median_time_to_leave: Optional[float]
+    early_leave_rate: Optional[float]
+    # window days -> (joins, leaves, churn)
+    windows: Dict[int, Tuple[int, int, Optional[float]]]
+
+
+class InviteAnalytics:
+    """Per-guild, per-inviter retention aggregates, updated as members join and leave.
+
+    Nothing is recomputed from the invite history: each join or leave
+    bumps counters, a log-scale time-to-leave histogram (for the median)
+    and a per-day bucket (for rolling windows, pruned past the longest
+    window). Churn over a window is the share of the inviter's members
+    present during it who left.
+    """
+
+    def __init__(self, path: str = None, windows: List[int] = None, early_leave_days: float = None,
+                 clock=time.time):
+        self.path = config.INVITE_ANALYTICS_FILE if path is None else path
+        self.windows = sorted(windows or config.INVITE_STATS_WINDOWS_DAYS)
+        self.early_leave_seconds = (config.INVITE_EARLY_LEAVE_DAYS if early_leave_days is None else early_leave_days) * DAY
+        self.clock = clock
+        # guild id -> inviter id -> stats
+        self.guilds: Dict[int, Dict[int, InviterStats]] = {}
+        self.save_task: Optional[asyncio.Task] = None
+        self.load()
+
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self.guilds = {
+                int(guild_id): {int(inviter_id): InviterStats.from_dict(stats) for inviter_id, stats in inviters.items()}
+                for guild_id, inviters in data.items()
+            }
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, ValueError, AttributeError) as e:
+            print(f"Ignoring unreadable invite analytics {self.path}: {e}")
+
+    async def save(self):
+        if not self.path:
+            return
+        data = {
+            str(guild_id): {str(inviter_id): stats.to_dict() for inviter_id, stats in inviters.items()}
+            for guild_id, inviters in self.guilds.items()
+        }
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            async with aiofiles.open(self.path, 'w') as f:
+                await f.write(json.dumps(data, separators=(',', ':')))
+        except OSError as e:
+            print(f"Error saving invite analytics {self.path}: {e}")
+
+    def schedule_save(self):
+        """Coalesce writes into one per interval"""
+        if self.save_task is None or self.save_task.done():
+            self.save_task = asyncio.get_running_loop().create_task(self.delayed_save())
+
+    async def delayed_save(self):
+        await asyncio.sleep(config.INVITE_ANALYTICS_SAVE_SECONDS)
+        await self.save()
+
+    async def close(self):
+        """Persist now instead of waiting for the pending save"""
+        if self.save_task and not self.save_task.done():
+            self.save_task.cancel()
+            await self.save()
+
+    def forget_guild(self, guild_id: int):
+        if self.guilds.pop(guild_id, None) is not None:
+            self.schedule_save()
+
+    def stats_for(self, guild_id: int, inviter_id: int) -> InviterStats:
+        return self.guilds.setdefault(guild_id, {}).setdefault(inviter_id, InviterStats())
+
+    def bump_day(self, stats: InviterStats, at: float, joined: bool):
+        today = int(at // DAY)
+        counts = stats.days.setdefault(today, [0, 0])
+        counts[0 if joined else 1] += 1
+        # Days past the longest window never count again
+        oldest = today - (self.windows[-1] if self.windows else 0)
+        for day in [day for day in stats.days if day <= oldest]:
+            del stats.days[day]
+
+    def record_join(self, guild_id: int, inviter_id: int, at: Optional[float] = None):
+        stats = self.stats_for(guild_id, inviter_id)
+        stats.joins += 1
+        self.bump_day(stats, self.clock() if at is None else at, joined=True)
+        self.schedule_save()
+
+    def record_leave(self, guild_id: int, inviter_id: int, joined_at: Optional[float], at: Optional[float] = None):
+        """Count a leave; `joined_at` is None for members credited before join times were kept"""
+        at = self.clock() if at is None else at
+        stats = self.stats_for(guild_id, inviter_id)
+        stats.leaves += 1
+        if joined_at is not None:
+            stayed = at - joined_at
+            bucket = duration_bucket(stayed)
+            stats.time_to_leave[bucket] = stats.time_to_leave.get(bucket, 0) + 1
+            if stayed < self.early_leave_seconds:
+                stats.early_leaves += 1
+        self.bump_day(stats, at, joined=False)
+        self.schedule_save()
+
+    def report(self, guild_id: int, inviter_id: int, now: Optional[float] = None) -> InviterReport:
+        stats = self.guilds.get(guild_id, {}).get(inviter_id, InviterStats())
+        today = int((self.clock() if now is None else now) // DAY)
+        windows = {}
+        for days in self.windows:
+            joins, leaves = stats.window(today, days)
+            present = stats.retained + leaves
+            windows[days] = (joins, leaves, leaves / present if present else None)
+        timed_leaves = sum(stats.time_to_leave.values())
+        return InviterReport(
+            inviter_id=inviter_id,
+            joins=stats.joins,
+            leaves=stats.leaves,
+            retained=stats.retained,
+            retention=stats.retained / stats.joins if stats.joins else None,
+            median_time_to_leave=stats.median_time_to_leave(),
+            early_leave_rate=stats.early_leaves / timed_leaves if timed_leaves else None,
+            windows=windows
+        )
+
+    def top_retention(self, guild_id: int, limit: int = 5, min_joins: int = 3) -> List[InviterReport]:
+        """Inviters with at least `min_joins` joins, best retention (then most retained) first"""
+        reports = [self.report(guild_id, inviter_id) for inviter_id, stats in self.guilds.get(guild_id, {}).items()
+                   if stats.joins >= min_joins]
+        reports.sort(key=lambda report: (report.retention, report.retained), reverse=True)
+        return reports[:limit]
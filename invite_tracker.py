@@ -1,68 +1,337 @@
+import asyncio
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+import aiofiles
 import discord
 from discord.ext import commands
 import config
-from data_manager import DataManager
+from invite_analytics import InviteAnalytics
+from tracker_digest import Digest, TrackerDigest
 
 class InviteTracker:
     def __init__(self, bot):
         self.bot = bot
-        self.data_manager = DataManager()
-        self.invite_cache = {}
+        # Shared with the other systems so every read sees every write
+        self.data_manager = bot.data_manager
+        # guild id -> code -> uses
+        self.invite_cache: Dict[int, Dict[str, int]] = {}
+        # guild id -> code -> inviter, max_uses, expires_at (persisted with the uses)
+        self.invite_details: Dict[int, Dict[str, Dict]] = {}
+        self.snapshot_file = config.INVITE_SNAPSHOT_FILE
+        # guild id -> snapshot entry not yet reconciled with live invites
+        self.offline_snapshot: Dict[int, Dict] = {}
+        self.snapshot_save_task: Optional[asyncio.Task] = None
+        # Joins waiting for the next invite diff, per guild
+        self.pending_joins: Dict[int, List[discord.Member]] = {}
+        self.join_batch_tasks: Dict[int, asyncio.Task] = {}
+        # Serializes invite fetch + diff + cache update, per guild
+        self.invite_locks: Dict[int, asyncio.Lock] = {}
+        # Per-inviter retention aggregates, updated on every credited join and leave
+        self.analytics = InviteAnalytics()
+        # Raids and mass leaves are summarized instead of posted one by one
+        self.digest = TrackerDigest(
+            self.post_digest,
+            window_seconds=config.INVITE_DIGEST_SECONDS,
+            threshold=config.INVITE_DIGEST_THRESHOLD
+        )
+        self.join_stats = {
+            'joins': 0,
+            'fetches': 0,
+            'attributed': 0,
+            'unattributed': 0
+        }
+
+    def invite_lock(self, guild_id: int) -> asyncio.Lock:
+        lock = self.invite_locks.get(guild_id)
+        if lock is None:
+            lock = self.invite_locks[guild_id] = asyncio.Lock()
+        return lock
+
+    def load_snapshot(self) -> Dict[int, Dict]:
+        """Per-guild invite uses saved before the last shutdown"""
+        try:
+            with open(self.snapshot_file, 'r') as f:
+                data = json.load(f)
+            if 'guilds' not in data:
+                # Written before guild partitioning: a single guild's entry
+                return {int(data.get('guild_id', 0)): data}
+            return {int(guild_id): entry for guild_id, entry in data['guilds'].items()}
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, ValueError, AttributeError) as e:
+            print(f"Ignoring unreadable invite snapshot {self.snapshot_file}: {e}")
+        return {}
+
+    async def save_snapshot(self):
+        """Persist each guild's code -> uses, inviter, max_uses, expires_at as compact JSON"""
+        now = time.time()
+        # Guilds not reconciled yet keep their old entry (and its save time)
+        guilds = {str(guild_id): entry for guild_id, entry in self.offline_snapshot.items()}
+        for guild_id, cache in self.invite_cache.items():
+            details = self.invite_details.get(guild_id, {})
+            invites = {code: {'uses': uses, **details.get(code, {})} for code, uses in cache.items()}
+            guilds[str(guild_id)] = {'saved_at': now, 'invites': invites}
+        try:
+            directory = os.path.dirname(self.snapshot_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            async with aiofiles.open(self.snapshot_file, 'w') as f:
+                await f.write(json.dumps({'guilds': guilds}, separators=(',', ':')))
+        except OSError as e:
+            print(f"Error saving invite snapshot {self.snapshot_file}: {e}")
+
+    def schedule_snapshot_save(self):
+        """Coalesce snapshot writes into one per interval"""
+        if self.snapshot_save_task is None or self.snapshot_save_task.done():
+            self.snapshot_save_task = asyncio.get_running_loop().create_task(self.delayed_snapshot_save())
+
+    async def delayed_snapshot_save(self):
+        await asyncio.sleep(config.INVITE_SNAPSHOT_SAVE_SECONDS)
+        await self.save_snapshot()
+
+    def update_cache(self, guild_id: int, invites: List[discord.Invite]):
+        """Replace a guild's uses table from a fresh invites fetch"""
+        self.invite_cache[guild_id] = {invite.code: invite.uses for invite in invites}
+        self.invite_details[guild_id] = {invite.code: self.invite_details_for(invite) for invite in invites}
+
+    @staticmethod
+    def invite_details_for(invite: discord.Invite) -> Dict:
+        return {
+            'inviter': invite.inviter.id if invite.inviter else None,
+            'max_uses': invite.max_uses or 0,
+            'expires_at': invite.expires_at.timestamp() if invite.expires_at else None
+        }
+
+    def handle_invite_create(self, invite: discord.Invite):
+        """Track a newly created invite"""
+        guild_id = invite.guild.id
+        if guild_id not in self.invite_cache:
+            # Not cached yet; the initial fetch will include it
+            return
+        self.invite_cache[guild_id][invite.code] = invite.uses
+        self.invite_details.setdefault(guild_id, {})[invite.code] = self.invite_details_for(invite)
+        self.schedule_snapshot_save()
+
+    def handle_invite_delete(self, invite: discord.Invite):
+        """Stop tracking a deleted invite"""
+        guild_id = invite.guild.id
+        self.invite_cache.get(guild_id, {}).pop(invite.code, None)
+        self.invite_details.get(guild_id, {}).pop(invite.code, None)
+        self.schedule_snapshot_save()
+
+    def forget_guild(self, guild: discord.Guild):
+        """Drop all invite state for a guild the bot left"""
+        self.invite_cache.pop(guild.id, None)
+        self.invite_details.pop(guild.id, None)
+        self.offline_snapshot.pop(guild.id, None)
+        self.pending_joins.pop(guild.id, None)
+        self.invite_locks.pop(guild.id, None)
+        task = self.join_batch_tasks.pop(guild.id, None)
+        if task:
+            task.cancel()
+        self.digest.forget_guild(guild.id)
+        self.analytics.forget_guild(guild.id)
+        self.schedule_snapshot_save()
+
+    async def close(self):
+        """Post collecting digests and persist the uses table now instead of waiting"""
+        await self.digest.close()
+        await self.analytics.close()
+        if self.snapshot_save_task and not self.snapshot_save_task.done():
+            self.snapshot_save_task.cancel()
+            await self.save_snapshot()
 
     async def cache_invites(self):
-        """Cache all current invites for tracking"""
+        """Cache every guild's invites concurrently, crediting joins made while offline"""
+        await self.bot.wait_until_ready()
+        if not self.bot.guilds:
+            print("No guilds found for invite caching")
+            return
+        self.offline_snapshot = self.load_snapshot()
+        guild_ids = {guild.id for guild in self.bot.guilds}
+        for guild_id in list(self.offline_snapshot):
+            if guild_id not in guild_ids:
+                # Left while offline
+                del self.offline_snapshot[guild_id]
+
+        await asyncio.gather(*(self.cache_guild_invites(guild, save=False) for guild in self.bot.guilds))
+        await self.save_snapshot()
+
+    async def cache_guild_invites(self, guild: discord.Guild, save: bool = True):
+        """Cache one guild's invites, crediting joins since its snapshot entry"""
         try:
-            # Get the first guild the bot is in (most bots are only in one guild)
-            if self.bot.guilds:
-                guild = self.bot.guilds[0]
+            async with self.invite_lock(guild.id):
                 invites = await guild.invites()
-                self.invite_cache = {invite.code: invite.uses for invite in invites}
-                print(f"Cached {len(self.invite_cache)} invites for guild: {guild.name}")
-            else:
-                print("No guilds found for invite caching")
+                previous = self.offline_snapshot.pop(guild.id, None)
+                credited = self.reconcile_offline_joins(guild, invites, previous) if previous else []
+                self.update_cache(guild.id, invites)
+            print(f"Cached {len(invites)} invites for guild: {guild.name}")
+            if save:
+                self.schedule_snapshot_save()
+            # Joins held back while the cache was missing (none if the reconcile took them)
+            if self.pending_joins.get(guild.id):
+                self.start_join_batch(guild)
+
+            for member, inviter_id in credited:
+                await self.credit_join(guild.id, inviter_id, member)
+                print(f"Member {member} was invited by {inviter_id} (joined while offline)")
         except Exception as e:
-            print(f"Error caching invites: {e}")
+            print(f"Error caching invites for guild {guild.id}: {e}")
+
+    async def credit_join(self, guild_id: int, inviter_id: int, member: discord.Member):
+        """Record an attributed join in the invite data and the retention aggregates"""
+        joined_at = member.joined_at.timestamp() if member.joined_at else None
+        await self.data_manager.add_invite(guild_id, inviter_id, member.id, joined_at)
+        self.analytics.record_join(guild_id, inviter_id, joined_at)
+
+    def reconcile_offline_joins(self, guild: discord.Guild, invites: List[discord.Invite],
+                                snapshot: Dict) -> List[Tuple[discord.Member, int]]:
+        """Match joins since a guild's snapshot entry against the uses they added.
+
+        Members who joined after the snapshot was saved (plus any joins
+        queued before this ran) share the new uses of live invites and the
+        remaining uses of invites that were used up and deleted while
+        offline. Credit goes in join order; cases where that order is a guess
+        are logged.
+        """
+        saved_at = snapshot.get('saved_at', 0)
+        previous = snapshot.get('invites', {})
+        now = time.time()
+
+        joiners = [
+            member for member in guild.members
+            if not member.bot and member.joined_at and member.joined_at.timestamp() > saved_at
+            and self.data_manager.get_inviter(guild.id, member.id) is None
+        ]
+        queued = self.pending_joins.pop(guild.id, [])
+        joiner_ids = {member.id for member in joiners}
+        joiners.extend(member for member in queued if member.id not in joiner_ids)
+        joiners.sort(key=lambda member: member.joined_at.timestamp() if member.joined_at else now)
+
+        slots: List[int] = []
+        used_invites = 0
+        live_codes = set()
+        for invite in invites:
+            live_codes.add(invite.code)
+            delta = (invite.uses or 0) - previous.get(invite.code, {}).get('uses', 0)
+            if delta > 0 and invite.inviter:
+                slots.extend([invite.inviter.id] * delta)
+                used_invites += 1
+        for code, entry in previous.items():
+            if code in live_codes or not entry.get('inviter') or not entry.get('max_uses'):
+                continue
+            # Gone before expiring: it was used up
+            if entry.get('expires_at') is None or entry['expires_at'] > now:
+                remaining = entry['max_uses'] - entry.get('uses', 0)
+                if remaining > 0:
+                    slots.extend([entry['inviter']] * remaining)
+                    used_invites += 1
+
+        if not joiners and not slots:
+            return []
+        print(f"Reconciling {len(joiners)} join(s) since last run against {len(slots)} invite use(s)")
+        if len(joiners) > 1 and used_invites > 1:
+            print(f"Ambiguous: {len(joiners)} joins across {used_invites} invites - credited in join order")
+        if len(slots) < len(joiners):
+            print(f"{len(joiners) - len(slots)} offline join(s) could not be attributed (vanity URL or expired invite)")
+        elif len(slots) > len(joiners):
+            print(f"{len(slots) - len(joiners)} invite use(s) have no matching member (they may have left again)")
+
+        credited = list(zip(joiners, slots))
+        self.join_stats['attributed'] += len(credited)
+        self.join_stats['unattributed'] += max(0, len(joiners) - len(slots))
+        return credited
 
     async def handle_member_join(self, member: discord.Member):
-        """Handle new member join - determine who invited them"""
-        try:
-            # Get current invites
-            guild = member.guild
-            current_invites = await guild.invites()
-            
-            # Find which invite was used
-            used_invite = None
-            for invite in current_invites:
-                cached_uses = self.invite_cache.get(invite.code, 0)
-                if invite.uses > cached_uses:
-                    used_invite = invite
-                    break
-            
-            if used_invite:
-                # Update cache
-                self.invite_cache[used_invite.code] = used_invite.uses
-                
-                # Record the invite
-                await self.data_manager.add_invite(used_invite.inviter.id, member.id)
-                
-                print(f"Member {member} was invited by {used_invite.inviter}")
-                print(f"Inviter ID: {used_invite.inviter.id}, Member ID: {member.id}")
-                
-                # Debug: Check invite count after adding
-                inviter_count = self.data_manager.get_invite_count(used_invite.inviter.id)
-                print(f"Inviter's total invites after recording: {inviter_count}")
-                
-                # Post to invite tracker channel
-                await self.post_invite_tracker_message(member, used_invite.inviter)
-                
-                # Optional: Send welcome message with inviter info
-                # await self.send_welcome_message(member, used_invite.inviter)
-                
-            else:
-                print(f"Could not determine who invited {member}")
-                
-        except Exception as e:
-            print(f"Error handling member join: {e}")
+        """Handle new member join - queue it for the next invite diff"""
+        guild = member.guild
+        self.pending_joins.setdefault(guild.id, []).append(member)
+        self.join_stats['joins'] += 1
+        self.start_join_batch(guild)
+
+    def start_join_batch(self, guild: discord.Guild):
+        task = self.join_batch_tasks.get(guild.id)
+        if task is None or task.done():
+            self.join_batch_tasks[guild.id] = asyncio.get_running_loop().create_task(self.process_join_batch(guild))
+
+    async def process_join_batch(self, guild: discord.Guild):
+        """Attribute every join from a short window with one invites fetch"""
+        failures = 0
+        # Keep going while joins arrive during a fetch, so none are stranded
+        while self.pending_joins.get(guild.id):
+            await asyncio.sleep(config.INVITE_JOIN_BATCH_SECONDS)
+            async with self.invite_lock(guild.id):
+                if guild.id not in self.invite_cache:
+                    # Diffing against no cache would credit lifetime uses; cache_guild_invites takes these joins
+                    return
+                joins = self.pending_joins.pop(guild.id, [])
+                if not joins:
+                    # Already credited by the startup reconcile
+                    continue
+                try:
+                    current_invites = await guild.invites()
+                    self.join_stats['fetches'] += 1
+                except discord.HTTPException as e:
+                    failures += 1
+                    if failures < config.INVITE_JOIN_FETCH_ATTEMPTS:
+                        # Ahead of joins that arrived meanwhile, for the next window
+                        self.pending_joins[guild.id] = joins + self.pending_joins.get(guild.id, [])
+                        print(f"Error fetching invites for {len(joins)} join(s), retrying: {e}")
+                    else:
+                        self.join_stats['unattributed'] += len(joins)
+                        print(f"Error fetching invites; giving up on {len(joins)} join(s): {e}")
+                        failures = 0
+                    continue
+                failures = 0
+
+                attributions = self.attribute_joins(joins, current_invites, self.invite_cache.get(guild.id, {}))
+                # Serialized with the diff, so the next batch sees these uses
+                self.update_cache(guild.id, current_invites)
+                self.schedule_snapshot_save()
+
+            for member, inviter in attributions:
+                try:
+                    if inviter is None:
+                        self.join_stats['unattributed'] += 1
+                        print(f"Could not determine who invited {member}")
+                        continue
+                    self.join_stats['attributed'] += 1
+
+                    # Record the invite
+                    await self.credit_join(guild.id, inviter.id, member)
+
+                    print(f"Member {member} was invited by {inviter}")
+                    print(f"Inviter ID: {inviter.id}, Member ID: {member.id}")
+
+                    # Post to invite tracker channel
+                    await self.post_invite_tracker_message(member, inviter)
+
+                    # Optional: Send welcome message with inviter info
+                    # await self.send_welcome_message(member, inviter)
+
+                except Exception as e:
+                    print(f"Error handling member join: {e}")
+
+    @staticmethod
+    def attribute_joins(joins: List[discord.Member], invites: List[discord.Invite],
+                        cached_uses: Dict[str, int]) -> List[Tuple[discord.Member, Optional[discord.abc.User]]]:
+        """Match a batch of joins to invites whose uses went up.
+
+        Each invite contributes one slot per new use, and joins take the
+        slots in arrival order. With a single used invite (the usual raid) or
+        a single join this is exact. With several of each, every inviter
+        still gets the right number of credits, though which member went to
+        which inviter is a best guess. Joins left without a slot (vanity URL,
+        invites deleted before the fetch) get no inviter.
+        """
+        slots = []
+        for invite in invites:
+            delta = (invite.uses or 0) - cached_uses.get(invite.code, 0)
+            if delta > 0 and invite.inviter:
+                slots.extend([invite.inviter] * delta)
+        return [(member, slots[i] if i < len(slots) else None) for i, member in enumerate(joins)]
 
     async def send_welcome_message(self, member: discord.Member, inviter: discord.Member):
         """Send welcome message with inviter info (optional)"""
@@ -83,56 +352,87 @@ class InviteTracker:
         except Exception as e:
             print(f"Error sending welcome message: {e}")
 
-    async def get_invite_stats(self, user_id: int) -> dict:
+    async def get_invite_stats(self, guild_id: int, user_id: int) -> dict:
         """Get invite statistics for a user"""
-        invite_count = self.data_manager.get_invite_count(user_id)
+        invite_count = self.data_manager.get_invite_count(guild_id, user_id)
         
-        # Get recent invites (last 30 days)
-        # This would require additional tracking in the data manager
-        # For now, just return the total count
+        # Recent invites come from the longest rolling analytics window
+        report = self.analytics.report(guild_id, user_id)
+        recent_invites = report.windows[max(report.windows)][0] if report.windows else invite_count
         
         return {
             'total_invites': invite_count,
-            'recent_invites': invite_count,  # Placeholder
-            'rank': self.get_invite_rank(user_id)
+            'recent_invites': recent_invites,
+            'rank': self.get_invite_rank(guild_id, user_id),
+            'retention': report
         }
 
-    def get_invite_rank(self, user_id: int) -> int:
+    def get_invite_rank(self, guild_id: int, user_id: int) -> int:
         """Get user's rank in invite leaderboard"""
-        leaderboard = self.data_manager.get_invites_leaderboard()
+        leaderboard = self.data_manager.get_invites_leaderboard(guild_id)
         for i, (user_id_str, count) in enumerate(leaderboard):
             if int(user_id_str) == user_id:
                 return i + 1
         return 0  # Not in top 10
 
+    def tracker_channel(self, guild_id: int):
+        """The guild's invite tracker channel, if configured and visible"""
+        channel_id = self.bot.guild_configs.get(guild_id).invite_tracker_channel_id
+        return self.bot.get_channel(channel_id) if channel_id else None
+
+    async def post_digest(self, guild_id: int, digest: Digest):
+        """Post one summary of the joins and leaves collected during a burst"""
+        channel = self.tracker_channel(guild_id)
+        if not channel:
+            return
+        embed = discord.Embed(
+            title="📈 Member Activity Digest",
+            description=(f"**{digest.joins}** joined and **{digest.leaves}** left "
+                         f"in the last {config.INVITE_DIGEST_SECONDS:.0f}s"),
+            color=config.EMBED_COLORS['info']
+        )
+        lines = []
+        for inviter_id, joins, leaves in digest.top_inviters(10):
+            total = self.data_manager.get_invite_count(guild_id, inviter_id)
+            lines.append(f"<@{inviter_id}>: +{joins} / -{leaves} ({total} total)")
+        if len(digest.inviters) > 10:
+            lines.append(f"...and {len(digest.inviters) - 10} more inviters")
+        embed.add_field(name="👤 By inviter", value="\n".join(lines) or "None", inline=False)
+        embed.timestamp = discord.utils.utcnow()
+        await channel.send(embed=embed)
+
     async def post_invite_tracker_message(self, member: discord.Member, inviter: discord.Member):
         """Post invite tracking message to the tracker channel"""
         try:
-            if config.INVITE_TRACKER_CHANNEL_ID:
-                channel = self.bot.get_channel(config.INVITE_TRACKER_CHANNEL_ID)
-                if channel:
-                    # Get inviter's total invite count
-                    inviter_count = self.data_manager.get_invite_count(inviter.id)
-                    
-                    embed = discord.Embed(
-                        title="🎉 New Member Joined!",
-                        description=f"**{member.mention}** joined the server!",
-                        color=config.EMBED_COLORS['success']
-                    )
-                    embed.add_field(
-                        name="👤 Invited by",
-                        value=f"{inviter.mention}",
-                        inline=True
-                    )
-                    embed.add_field(
-                        name="📊 Inviter's Total",
-                        value=f"{inviter_count} invites",
-                        inline=True
-                    )
-                    embed.set_thumbnail(url=member.display_avatar.url)
-                    embed.timestamp = discord.utils.utcnow()
-                    
-                    await channel.send(embed=embed)
+            channel = self.tracker_channel(member.guild.id)
+            if channel:
+                # Over the per-window budget: count it in the next digest instead
+                if not self.digest.admit(member.guild.id):
+                    self.digest.add(member.guild.id, inviter.id, joined=True)
+                    return
+
+                # Get inviter's total invite count
+                inviter_count = self.data_manager.get_invite_count(member.guild.id, inviter.id)
+                
+                embed = discord.Embed(
+                    title="🎉 New Member Joined!",
+                    description=f"**{member.mention}** joined the server!",
+                    color=config.EMBED_COLORS['success']
+                )
+                embed.add_field(
+                    name="👤 Invited by",
+                    value=f"{inviter.mention}",
+                    inline=True
+                )
+                embed.add_field(
+                    name="📊 Inviter's Total",
+                    value=f"{inviter_count} invites",
+                    inline=True
+                )
+                embed.set_thumbnail(url=member.display_avatar.url)
+                embed.timestamp = discord.utils.utcnow()
+                
+                await channel.send(embed=embed)
                     
         except Exception as e:
             print(f"Error posting to invite tracker channel: {e}")
@@ -143,12 +443,13 @@ class InviteTracker:
             print(f"Member {member} ({member.id}) left the server")
             
             # Get who invited this member
-            inviter_id = self.data_manager.get_inviter(member.id)
+            inviter_id = self.data_manager.get_inviter(member.guild.id, member.id)
             print(f"Inviter ID for {member.id}: {inviter_id}")
             
             if inviter_id:
                 # Remove invite point from inviter
-                await self.data_manager.remove_invite(inviter_id, member.id)
+                joined_at = await self.data_manager.remove_invite(member.guild.id, inviter_id, member.id)
+                self.analytics.record_leave(member.guild.id, inviter_id, joined_at)
                 
                 # Get inviter member object
                 inviter = member.guild.get_member(inviter_id)
@@ -167,31 +468,35 @@ class InviteTracker:
     async def post_member_leave_message(self, member: discord.Member, inviter_id: int, inviter_name: str):
         """Post member leave message to the tracker channel"""
         try:
-            if config.INVITE_TRACKER_CHANNEL_ID:
-                channel = self.bot.get_channel(config.INVITE_TRACKER_CHANNEL_ID)
-                if channel:
-                    # Get inviter's updated total invite count
-                    inviter_count = self.data_manager.get_invite_count(inviter_id)
-                    
-                    embed = discord.Embed(
-                        title="👋 Member Left",
-                        description=f"**{member.mention}** left the server.",
-                        color=config.EMBED_COLORS['warning']
-                    )
-                    embed.add_field(
-                        name="👤 Was invited by",
-                        value=f"<@{inviter_id}>",
-                        inline=True
-                    )
-                    embed.add_field(
-                        name="📊 Inviter's Total",
-                        value=f"{inviter_count} invites",
-                        inline=True
-                    )
-                    embed.set_thumbnail(url=member.display_avatar.url)
-                    embed.timestamp = discord.utils.utcnow()
-                    
-                    await channel.send(embed=embed)
+            channel = self.tracker_channel(member.guild.id)
+            if channel:
+                # Over the per-window budget: count it in the next digest instead
+                if not self.digest.admit(member.guild.id):
+                    self.digest.add(member.guild.id, inviter_id, joined=False)
+                    return
+
+                # Get inviter's updated total invite count
+                inviter_count = self.data_manager.get_invite_count(member.guild.id, inviter_id)
+                
+                embed = discord.Embed(
+                    title="👋 Member Left",
+                    description=f"**{member.mention}** left the server.",
+                    color=config.EMBED_COLORS['warning']
+                )
+                embed.add_field(
+                    name="👤 Was invited by",
+                    value=f"<@{inviter_id}>",
+                    inline=True
+                )
+                embed.add_field(
+                    name="📊 Inviter's Total",
+                    value=f"{inviter_count} invites",
+                    inline=True
+                )
+                embed.set_thumbnail(url=member.display_avatar.url)
+                embed.timestamp = discord.utils.utcnow()
+                
+                await channel.send(embed=embed)
                     
         except Exception as e:
-            print(f"Error posting member leave message: {e}") 
\ No newline at end of file
+            print(f"Error posting member leave message: {e}")
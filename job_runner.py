@@ -0,0 +1,74 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+
+class Job:
+    """A named background task plus whatever it reports as progress"""
+
+    def __init__(self, name: str, task: asyncio.Task, progress=None):
+        self.name = name
+        self.task = task
+        self.progress = progress
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        task.add_done_callback(self.finished)
+
+    def finished(self, task: asyncio.Task):
+        self.finished_at = time.monotonic()
+        if not task.cancelled() and task.exception():
+            print(f"Job {self.name} failed: {task.exception()}")
+
+    @property
+    def running(self) -> bool:
+        return not self.task.done()
+
+    @property
+    def status(self) -> str:
+        if self.running:
+            return "running"
+        if self.task.cancelled():
+            return "cancelled"
+        return "failed" if self.task.exception() else "complete"
+
+    def summary(self) -> str:
+        progress = self.progress.summary() if self.progress is not None else ""
+        return f"{self.name} {self.status}" + (f": {progress}" if progress else "")
+
+
+class JobRunner:
+    """Runs at most one job per name and keeps the last one for status queries"""
+
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+
+    def submit(self, name: str, job: Callable[[], Awaitable], progress=None) -> bool:
+        """Start `job()` unless a job with this name is still running"""
+        current = self.jobs.get(name)
+        if current is not None and current.running:
+            return False
+        task = asyncio.get_running_loop().create_task(job())
+        self.jobs[name] = Job(name, task, progress)
+        return True
+
+    def get(self, name: str) -> Optional[Job]:
+        return self.jobs.get(name)
+
+    def running(self, name: str) -> bool:
+        job = self.jobs.get(name)
+        return job is not None and job.running
+
+    def cancel(self, name: str) -> bool:
+        """Cancel a running job; False if none is running"""
+        job = self.jobs.get(name)
+        if job is None or not job.running:
+            return False
+        job.task.cancel()
+        return True
+
+    async def close(self):
+        """Cancel every running job and wait for them to stop"""
+        tasks = [job.task for job in self.jobs.values() if job.running]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
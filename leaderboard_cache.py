@@ -0,0 +1,74 @@
+import time
+from typing import Dict, FrozenSet, Hashable, List, NamedTuple, Optional, Tuple
+
+import config
+
+
+class RenderedBoard(NamedTuple):
+    text: str
+    # Ids shown on the board and the lowest score shown
+    user_ids: FrozenSet[str]
+    min_score: int
+    # Fewer rows than the board's size: any new score would appear
+    full: bool
+    built_at: float
+
+    def affected_by(self, user_id: str, score: int) -> bool:
+        """Whether a user's new score could change what this board shows"""
+        # Ties at the cutoff are ordered by user id, so an equal score may still move in
+        return user_id in self.user_ids or not self.full or score >= self.min_score
+
+
+class LeaderboardCache:
+    """Rendered leaderboard text per (guild, board), keyed by (size, style).
+
+    DataManager reports every score change through `changed`; only boards
+    whose visible top-N the new score could affect are dropped, so reads
+    between relevant mutations are a dict lookup with no sorting, name
+    lookups or string building. Entries also expire after `max_age`
+    seconds so renamed users eventually show their new name.
+    """
+
+    def __init__(self, max_age: float = None, clock=time.monotonic):
+        self.max_age = config.LEADERBOARD_CACHE_SECONDS if max_age is None else max_age
+        self.clock = clock
+        self.boards: Dict[Tuple[int, str], Dict[Hashable, RenderedBoard]] = {}
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'invalidations': 0
+        }
+
+    def get(self, guild_id: int, board: str, key: Hashable) -> Optional[str]:
+        entry = self.boards.get((guild_id, board), {}).get(key)
+        if entry is None or self.clock() - entry.built_at > self.max_age:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return entry.text
+
+    def put(self, guild_id: int, board: str, key: Hashable, size: int, rows: List[Tuple[str, int]], text: str):
+        """Cache the text rendered from a board's top `size` rows"""
+        self.boards.setdefault((guild_id, board), {})[key] = RenderedBoard(
+            text=text,
+            user_ids=frozenset(user_id for user_id, _ in rows),
+            min_score=rows[-1][1] if rows else 0,
+            full=len(rows) >= size,
+            built_at=self.clock()
+        )
+
+    def changed(self, guild_id: int, board: str, user_id: str, score: int):
+        """Drop cached renders of a board that a user's new score could change"""
+        entries = self.boards.get((guild_id, board))
+        if not entries:
+            return
+        for key in [key for key, entry in entries.items() if entry.affected_by(user_id, score)]:
+            del entries[key]
+            self.stats['invalidations'] += 1
+
+    def renamed(self, user_id: str):
+        """Drop every cached render that shows a user whose display name changed"""
+        for entries in self.boards.values():
+            for key in [key for key, entry in entries.items() if user_id in entry.user_ids]:
+                del entries[key]
+                self.stats['invalidations'] += 1
@@ -0,0 +1,60 @@
+import bisect
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# (score, user id) of a row; pages are fetched relative to one
+Cursor = Tuple[int, int]
+
+
+class RankedBoard:
+    """One guild's board kept in rank order for cursor and offset queries.
+
+    Rows are stored as (-score, user id) in a sorted list, so the best
+    score comes first and ties are ordered by user id. Finding a cursor is
+    a bisect and a page is a slice: O(log n + page) per query. A score
+    change removes and re-inserts one key.
+    """
+
+    def __init__(self, scores: Iterable[Tuple[str, int]] = ()):
+        self.scores: Dict[int, int] = {int(user_id): score for user_id, score in scores}
+        self.keys: List[Tuple[int, int]] = sorted((-score, user_id) for user_id, score in self.scores.items())
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def update(self, user_id: int, score: int):
+        old = self.scores.get(user_id)
+        if old == score:
+            return
+        if old is not None:
+            del self.keys[bisect.bisect_left(self.keys, (-old, user_id))]
+        self.scores[user_id] = score
+        bisect.insort(self.keys, (-score, user_id))
+
+    @staticmethod
+    def rows(keys: List[Tuple[int, int]]) -> List[Tuple[str, int]]:
+        # Same (user id, score) rows as the data files, for rendering and the leaderboard cache
+        return [(str(user_id), -negative_score) for negative_score, user_id in keys]
+
+    def page(self, start: int, limit: int) -> List[Tuple[str, int]]:
+        """Rows ranked start+1 .. start+limit"""
+        return self.rows(self.keys[start:start + limit])
+
+    def after(self, cursor: Cursor, limit: int) -> Tuple[int, List[Tuple[str, int]]]:
+        """(start index, rows) for the rows ranked below `cursor`"""
+        score, user_id = cursor
+        start = bisect.bisect_right(self.keys, (-score, user_id))
+        return start, self.page(start, limit)
+
+    def before(self, cursor: Cursor, limit: int) -> Tuple[int, List[Tuple[str, int]]]:
+        """(start index, rows) for the rows ranked just above `cursor`"""
+        score, user_id = cursor
+        end = bisect.bisect_left(self.keys, (-score, user_id))
+        start = max(0, end - limit)
+        return start, self.rows(self.keys[start:end])
+
+    def rank(self, user_id: int) -> Optional[int]:
+        """1-based rank of a user, None if they have no score"""
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        return bisect.bisect_left(self.keys, (-score, user_id)) + 1
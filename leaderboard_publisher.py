@@ -0,0 +1,183 @@
+import asyncio
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+import aiofiles
+import discord
+import config
+
+
+def board_digest(embed: discord.Embed, view: discord.ui.View) -> str:
+    """Fingerprint of what a board message shows, ignoring its updated-at timestamp"""
+    content = embed.to_dict()
+    content.pop('timestamp', None)
+    return hashlib.sha1(json.dumps([content, view.to_components()], sort_keys=True).encode()).hexdigest()
+
+
+@dataclass
+class PinnedBoard:
+    """The message a guild's board is kept in, and what it last showed"""
+    channel_id: int
+    message_id: int
+    digest: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {'channel': self.channel_id, 'message': self.message_id, 'digest': self.digest}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'PinnedBoard':
+        return cls(channel_id=int(data['channel']), message_id=int(data['message']), digest=data.get('digest'))
+
+
+class LeaderboardPublisher:
+    """One pinned, self-updating message per guild and board.
+
+    Every `interval` seconds each pinned board is re-rendered (a render
+    cache hit unless scores changed) and compared with the digest of what
+    the message last showed; the message is edited only when they differ,
+    so quiet boards cost no API calls. Deleting the message stops its
+    updates. Digests are persisted so a restart doesn't re-edit boards.
+    """
+
+    def __init__(self, bot, render: Callable[[int, str], Tuple[discord.Embed, discord.ui.View]],
+                 path: str = None, interval: float = None):
+        self.bot = bot
+        self.render = render
+        self.path = config.PINNED_LEADERBOARDS_FILE if path is None else path
+        self.interval = config.LEADERBOARD_REFRESH_SECONDS if interval is None else interval
+        # guild id -> board -> pinned message
+        self.boards: Dict[int, Dict[str, PinnedBoard]] = {}
+        self.stats = {
+            'checked': 0,
+            'edited': 0
+        }
+        self.load()
+
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self.boards = {
+                int(guild_id): {board: PinnedBoard.from_dict(entry) for board, entry in boards.items()}
+                for guild_id, boards in data.items()
+            }
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, ValueError, KeyError, AttributeError) as e:
+            print(f"Ignoring unreadable pinned leaderboards {self.path}: {e}")
+
+    async def save(self):
+        if not self.path:
+            return
+        data = {
+            str(guild_id): {board: entry.to_dict() for board, entry in boards.items()}
+            for guild_id, boards in self.boards.items()
+        }
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            async with aiofiles.open(self.path, 'w') as f:
+                await f.write(json.dumps(data, separators=(',', ':')))
+        except OSError as e:
+            print(f"Error saving pinned leaderboards {self.path}: {e}")
+
+    def pinned(self, guild_id: int, message_id: int) -> bool:
+        return any(entry.message_id == message_id for entry in self.boards.get(guild_id, {}).values())
+
+    def drop(self, guild_id: int, board: str):
+        boards = self.boards.get(guild_id, {})
+        boards.pop(board, None)
+        if not boards:
+            self.boards.pop(guild_id, None)
+
+    async def forget_guild(self, guild_id: int):
+        if self.boards.pop(guild_id, None) is not None:
+            await self.save()
+
+    async def publish(self, guild_id: int, board: str, channel: discord.abc.Messageable) -> bool:
+        """Pin a board in `channel`; True if a new message was posted, False if the pinned one was refreshed"""
+        entry = self.boards.get(guild_id, {}).get(board)
+        if entry is not None and entry.channel_id == channel.id:
+            # refresh() never touches an unchanged board, so check the message is still there
+            try:
+                await channel.fetch_message(entry.message_id)
+            except discord.NotFound:
+                self.drop(guild_id, board)
+            else:
+                await self.refresh(guild_id, board)
+                await self.save()
+                return False
+        elif entry is not None:
+            # Moving the board: retire the message in the old channel
+            old_channel = self.bot.get_channel(entry.channel_id)
+            if old_channel is not None:
+                try:
+                    await old_channel.get_partial_message(entry.message_id).delete()
+                except discord.HTTPException as e:
+                    print(f"Couldn't remove old {board} leaderboard in guild {guild_id}: {e}")
+
+        embed, view = self.render(guild_id, board)
+        digest = board_digest(embed, view)
+        embed.timestamp = discord.utils.utcnow()
+        message = await channel.send(embed=embed, view=view)
+        try:
+            await message.pin()
+        except discord.HTTPException as e:
+            print(f"Couldn't pin {board} leaderboard in guild {guild_id}: {e}")
+        self.boards.setdefault(guild_id, {})[board] = PinnedBoard(channel.id, message.id, digest)
+        await self.save()
+        return True
+
+    async def refresh(self, guild_id: int, board: str) -> bool:
+        """Edit a pinned board if what it shows changed; True if it was edited"""
+        entry = self.boards.get(guild_id, {}).get(board)
+        if entry is None:
+            return False
+        self.stats['checked'] += 1
+        embed, view = self.render(guild_id, board)
+        digest = board_digest(embed, view)
+        if digest == entry.digest:
+            return False
+        channel = self.bot.get_channel(entry.channel_id)
+        if channel is None:
+            # Not cached yet (or no longer visible); try again next interval
+            return False
+
+        embed.timestamp = discord.utils.utcnow()
+        try:
+            await channel.get_partial_message(entry.message_id).edit(embed=embed, view=view)
+        except discord.NotFound:
+            print(f"Pinned {board} leaderboard in guild {guild_id} was deleted; no longer updating it")
+            self.drop(guild_id, board)
+            return False
+        except discord.HTTPException as e:
+            print(f"Error updating {board} leaderboard in guild {guild_id}: {e}")
+            return False
+        entry.digest = digest
+        self.stats['edited'] += 1
+        return True
+
+    async def refresh_all(self):
+        """Refresh every pinned board once, saving if any changed"""
+        before = {(guild_id, board): entry.digest for guild_id, boards in self.boards.items() for board, entry in boards.items()}
+        for guild_id, board in list(before):
+            try:
+                await self.refresh(guild_id, board)
+            except Exception as e:
+                print(f"Error refreshing {board} leaderboard in guild {guild_id}: {e}")
+        after = {(guild_id, board): entry.digest for guild_id, boards in self.boards.items() for board, entry in boards.items()}
+        if after != before:
+            await self.save()
+
+    async def run(self):
+        """Refresh pinned boards every interval, starting once the bot is ready"""
+        await self.bot.wait_until_ready()
+        while True:
+            await self.refresh_all()
+            await asyncio.sleep(self.interval)
@@ -7,6 +7,11 @@ from vouch_system import VouchSystem
 from invite_tracker import InviteTracker
 from verification_system import VerificationSystem
 from commands import BotCommands
+from role_index import RoleIndex
+from job_runner import JobRunner
+from data_manager import DataManager
+from guild_config import GuildConfigStore
+from name_resolver import NameResolver
 
 class BobsDiscountBot(commands.Bot):
     def __init__(self):
@@ -22,6 +27,11 @@ class BobsDiscountBot(commands.Bot):
         )
         
         # Initialize systems
+        self.guild_configs = GuildConfigStore()
+        self.data_manager = DataManager()
+        self.role_index = RoleIndex()
+        self.jobs = JobRunner()
+        self.names = NameResolver(self)
         self.moderation = Moderation(self)
         self.vouch_system = VouchSystem(self)
         self.invite_tracker = InviteTracker(self)
@@ -32,20 +42,33 @@ class BobsDiscountBot(commands.Bot):
         # Add command cog
         await self.add_cog(BotCommands(self))
         
-        # Cache invites for tracking
-        await self.invite_tracker.cache_invites()
+        # Cache every guild's invites once ready, crediting joins missed while offline
+        self.jobs.submit("invite_reconcile", self.invite_tracker.cache_invites)
         
-        # Scan all members for verification status on startup
-        await self.verification_system.scan_all_members()
+        # Once ready, reconcile members changed since the last snapshot with one background scan per guild
+        self.jobs.submit("startup_scans", self.verification_system.scan_all_guilds)
         
         print("Bot setup complete!")
 
+    async def close(self):
+        """Stop background jobs and drain moderation queues (bounded) before disconnecting"""
+        await self.jobs.close()
+        await self.verification_system.close()
+        await self.invite_tracker.close()
+        await self.names.close()
+        await self.moderation.close()
+        await super().close()
+
     async def on_ready(self):
         """Bot ready event"""
         print(f"Logged in as {self.user}")
         print(f"Bot ID: {self.user.id}")
         print(f"Connected to {len(self.guilds)} guild(s)")
         
+        # Index role membership from the member cache
+        for guild in self.guilds:
+            self.role_index.build(guild)
+        
         # Sync commands
         try:
             synced = await self.tree.sync()
@@ -66,36 +89,62 @@ class BobsDiscountBot(commands.Bot):
         await self.moderation.check_message(message)
 
         # Handle vouch channel
-        if message.channel.id == config.VOUCH_CHANNEL_ID:
+        if message.guild and message.channel.id == self.guild_configs.get(message.guild.id).vouch_channel_id:
             print(f"Message in vouch channel from {message.author}")
             await self.vouch_system.handle_vouch_channel(message)
 
     async def on_member_join(self, member):
         """Handle new member joins for invite tracking and verification"""
+        self.role_index.add_member(member)
+        self.names.remember(member)
         await self.invite_tracker.handle_member_join(member)
         await self.verification_system.check_and_mute_unverified(member)
 
     async def on_member_remove(self, member):
         """Handle member leaves for invite tracking"""
+        self.role_index.remove_member(member)
+        # Keep the name of members who left for leaderboards
+        self.names.remember(member)
+        self.moderation.invalidate_member(member)
+        self.verification_system.forget_member(member)
         await self.invite_tracker.handle_member_leave(member)
 
+    async def on_guild_join(self, guild):
+        """Index, cache invites for and scan a newly joined guild"""
+        self.role_index.build(guild)
+        self.jobs.submit(f"invite_reconcile:{guild.id}", lambda: self.invite_tracker.cache_guild_invites(guild))
+        self.verification_system.start_scan(guild)
+
+    async def on_guild_remove(self, guild):
+        """Drop all state for a guild the bot left"""
+        self.role_index.forget_guild(guild)
+        self.invite_tracker.forget_guild(guild)
+        self.verification_system.forget_guild(guild)
+
     async def on_invite_create(self, invite):
         """Handle new invite creation"""
         # Update invite cache
-        self.invite_tracker.invite_cache[invite.code] = invite.uses
+        self.invite_tracker.handle_invite_create(invite)
         print(f"New invite created: {invite.code} by {invite.inviter}")
 
     async def on_invite_delete(self, invite):
         """Handle invite deletion"""
         # Remove from cache
-        if invite.code in self.invite_tracker.invite_cache:
-            del self.invite_tracker.invite_cache[invite.code]
+        self.invite_tracker.handle_invite_delete(invite)
         print(f"Invite deleted: {invite.code}")
 
     async def on_member_update(self, before, after):
         """Handle member updates for verification system"""
+        if before.roles != after.roles:
+            self.role_index.update_member(before, after)
+            self.moderation.invalidate_member(after)
         await self.verification_system.handle_member_update(before, after)
 
+    async def on_user_update(self, before, after):
+        """Keep leaderboard names current when a user renames"""
+        if before.name != after.name or before.global_name != after.global_name:
+            self.names.remember(after)
+
 async def main():
     """Main function to run the bot"""
     bot = BobsDiscountBot()
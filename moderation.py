@@ -1,95 +1,192 @@
-import re
+from typing import Dict, Tuple
 import discord
 from discord.ext import commands
 import config
+from action_dispatcher import ActionDispatcher
+from audit_log import AuditLog
+from domain_matcher import DomainMatcher, load_domain_file
+from duplicate_detector import DuplicateDetector, DuplicateHit
+from rate_limiter import RecentKeys, TokenBucketLimiter
+from rule_engine import Rule, RuleEngine, load_rules
+from text_normalizer import INVITE_REGEX, find_invite_in, normalize_content
 
 class Moderation:
     def __init__(self, bot):
         self.bot = bot
-        self.invite_pattern = re.compile(r'discord\.gg/[a-zA-Z0-9]+')
+        self.audit_log = AuditLog(
+            config.AUDIT_LOG_FILE,
+            max_bytes=config.AUDIT_LOG_MAX_BYTES,
+            backups=config.AUDIT_LOG_BACKUPS,
+            flush_seconds=config.AUDIT_LOG_FLUSH_SECONDS
+        )
+        self.dispatcher = ActionDispatcher(bot, self.audit_log)
+        self.stats = {
+            'messages': 0,
+            'trusted_skips': 0,
+            'notices_suppressed': 0
+        }
+
+        # Trusted members (per-guild trusted roles) skip every check; (guild id, member id) -> trusted
+        self.trust_cache: Dict[Tuple[int, int], bool] = {}
+        self.invite_pattern = INVITE_REGEX
         self.scam_domains = [
             'scam.com',
             'malicious.net',
             'fake-discord.com',
             # Add more domains as needed
         ]
+        self.domain_matcher = DomainMatcher(self.scam_domains, config.ALLOWED_DOMAINS)
+        self.load_scam_domain_file()
+        self.load_scam_domain_feed()
+        self.rule_engine = RuleEngine(load_rules(config.MODERATION_RULES_FILE), self.domain_matcher)
+
+        # Flood protection
+        self.user_limiter = TokenBucketLimiter(config.FLOOD_USER_RATE, config.FLOOD_USER_BURST)
+        self.channel_limiter = TokenBucketLimiter(config.FLOOD_CHANNEL_RATE, config.FLOOD_CHANNEL_BURST)
+        self.user_flood_rule = Rule(
+            index=-1,
+            name="user_flood",
+            actions=config.FLOOD_USER_ACTIONS,
+            reason="Message flooding",
+            timeout_minutes=config.FLOOD_TIMEOUT_MINUTES
+        )
+        self.channel_flood_rule = Rule(
+            index=-1,
+            name="channel_flood",
+            actions=config.FLOOD_CHANNEL_ACTIONS,
+            reason="Channel flood protection",
+            timeout_minutes=config.FLOOD_TIMEOUT_MINUTES
+        )
+
+        # Reminder DMs already sent, keyed by (user, rule)
+        self.recent_notices = RecentKeys(config.NOTICE_QUIET_SECONDS, config.NOTICE_CACHE_SIZE)
+
+        # Cross-channel duplicate spam
+        self.duplicate_detector = DuplicateDetector(
+            window_seconds=config.DUPLICATE_WINDOW_SECONDS,
+            channel_threshold=config.DUPLICATE_CHANNEL_THRESHOLD,
+            global_threshold=config.DUPLICATE_GLOBAL_THRESHOLD,
+            min_length=config.DUPLICATE_MIN_LENGTH,
+            mode=config.DUPLICATE_MODE
+        )
+        self.duplicate_rule = Rule(
+            index=-1,
+            name="duplicate_spam",
+            actions=config.DUPLICATE_ACTIONS,
+            reason="Duplicate message spam",
+            timeout_minutes=config.FLOOD_TIMEOUT_MINUTES
+        )
+        # Many users posting the same text; log-only unless configured
+        self.duplicate_global_rule = Rule(
+            index=-1,
+            name="duplicate_raid",
+            actions=config.DUPLICATE_GLOBAL_ACTIONS,
+            reason="Same message posted by many users",
+            timeout_minutes=config.FLOOD_TIMEOUT_MINUTES
+        )
+
+    async def close(self):
+        """Give queued actions time to run, stop the dispatcher and flush the audit log"""
+        await self.dispatcher.close()
+        await self.audit_log.close()
+
+    def load_scam_domain_file(self):
+        """Merge the optional external blocklist into the domain matcher"""
+        if not config.SCAM_DOMAINS_FILE:
+            return
+        try:
+            self.domain_matcher.add_blocked(load_domain_file(config.SCAM_DOMAINS_FILE))
+            print(f"Loaded {len(self.domain_matcher.blocked)} scam domains")
+        except OSError as e:
+            print(f"Error loading scam domain file {config.SCAM_DOMAINS_FILE}: {e}")
+
+    def load_scam_domain_feed(self):
+        """Attach the optional prebuilt bloom-filtered domain feed"""
+        if not config.SCAM_DOMAINS_FEED:
+            return
+        try:
+            from bloom_filter import DomainFeed
+            feed = DomainFeed(config.SCAM_DOMAINS_FEED)
+            self.domain_matcher.add_feed(feed)
+            print(f"Loaded scam domain feed with {len(feed)} domains")
+        except (OSError, ValueError) as e:
+            print(f"Error loading scam domain feed {config.SCAM_DOMAINS_FEED}: {e}")
+
+    def is_trusted(self, member) -> bool:
+        """Check for a trusted role, cached per member until their roles change"""
+        guild = getattr(member, 'guild', None)
+        if guild is None:
+            return False
+        key = (guild.id, member.id)
+        trusted = self.trust_cache.get(key)
+        if trusted is None:
+            trusted_role_ids = self.bot.guild_configs.get(guild.id).trusted_role_ids
+            trusted = self.bot.role_index.has_any_role(member, trusted_role_ids)
+            if len(self.trust_cache) >= config.TRUST_CACHE_SIZE:
+                del self.trust_cache[next(iter(self.trust_cache))]
+            self.trust_cache[key] = trusted
+        return trusted
+
+    def invalidate_member(self, member):
+        """Forget a member's cached trust (roles changed or they left)"""
+        self.trust_cache.pop((member.guild.id, member.id), None)
 
     def contains_invite_link(self, content: str) -> bool:
         """Check if message contains Discord invite link"""
-        return bool(self.invite_pattern.search(content))
+        return find_invite_in(content) is not None
 
     def contains_scam_domain(self, content: str) -> bool:
         """Check if message contains known scam domain"""
-        content_lower = content.lower()
-        return any(domain in content_lower for domain in self.scam_domains)
+        return self.domain_matcher.find_blocked(normalize_content(content)) is not None
 
-    async def handle_invite_link(self, message: discord.Message):
-        """Handle invite link detection - ban user immediately"""
-        try:
-            # Ban the user
-            await message.author.ban(reason="Posted Discord invite link")
-            
-            # Log the action
-            print(f"Banned user {message.author} ({message.author.id}) for posting invite link")
-            
-            # Send notification to staff (optional)
-            # You can implement this to notify staff channels
-            
-        except discord.Forbidden:
-            print(f"Cannot ban user {message.author} - insufficient permissions")
-        except Exception as e:
-            print(f"Error banning user {message.author}: {e}")
-
-    async def handle_scam_domain(self, message: discord.Message):
-        """Handle scam domain detection - delete message and ban user"""
-        try:
-            # Delete the message
-            await message.delete()
-            
-            # Ban the user
-            await message.author.ban(reason="Posted scam/malicious domain")
-            
-            # Log the action
-            print(f"Banned user {message.author} ({message.author.id}) for posting scam domain")
-            
-        except discord.Forbidden:
-            print(f"Cannot ban user {message.author} - insufficient permissions")
-        except Exception as e:
-            print(f"Error handling scam domain for user {message.author}: {e}")
-
-    async def handle_order_channel(self, message: discord.Message):
-        """Handle order channel protection - delete ALL messages"""
-        try:
-            # Delete the message
-            await message.delete()
-            
-            # Send ephemeral message to the user
-            await message.author.send(
-                f"Please use `/order` in order channels or `/ticket` in ticket channels.",
-                delete_after=10
-            )
-            
-        except discord.Forbidden:
-            print(f"Cannot delete message in order channel - insufficient permissions")
-        except Exception as e:
-            print(f"Error handling order channel message: {e}")
-
-    async def handle_support_channel(self, message: discord.Message):
-        """Handle support channel protection - delete ALL messages"""
-        try:
-            # Delete the message
-            await message.delete()
-            
-            # Send ephemeral message to the user
-            await message.author.send(
-                f"Please use `/order` in order channels or `/ticket` in ticket channels.",
-                delete_after=10
-            )
-            
-        except discord.Forbidden:
-            print(f"Cannot delete message in support channel - insufficient permissions")
-        except Exception as e:
-            print(f"Error handling support channel message: {e}")
+    async def execute_rule(self, rule: Rule, message: discord.Message):
+        """Queue a matched rule's actions for the dispatcher"""
+        author = message.author
+        for action in rule.actions:
+            if action == 'delete':
+                self.dispatcher.delete(message, rule.name, rule.reason)
+            elif action == 'ban':
+                self.dispatcher.ban(author, rule.name, rule.reason, message)
+            elif action == 'timeout':
+                self.dispatcher.timeout(author, rule.timeout_minutes, rule.name, rule.reason, message)
+            elif action == 'notify' and rule.notice:
+                if self.recent_notices.add((author.id, rule.name)):
+                    self.dispatcher.send_dm(author, rule.notice, rule.name, message)
+                else:
+                    self.stats['notices_suppressed'] += 1
+            elif action == 'log':
+                print(f"Rule {rule.name}: {author} ({author.id}) in channel {message.channel.id} - {rule.reason}")
+                self.audit_log.record(
+                    'log',
+                    rule.name,
+                    message.guild.id if message.guild else 0,
+                    author.id,
+                    message.channel.id,
+                    message.id
+                )
+
+    async def handle_duplicate_hit(self, hit: DuplicateHit, message: discord.Message):
+        """Clean up an earlier burst of duplicates and action the posters"""
+        rule = self.duplicate_global_rule if hit.scope == 'global' else self.duplicate_rule
+        if 'delete' in rule.actions:
+            for post in hit.posts:
+                channel = self.bot.get_channel(post.channel_id)
+                if channel:
+                    self.dispatcher.delete(channel.get_partial_message(post.message_id), rule.name, rule.reason, post.user_id)
+
+        print(f"Duplicate spam ({hit.scope}): {len(hit.posts) + 1} posts from {message.author} ({message.author.id})")
+        await self.execute_rule(rule, message)
+
+        # A raid of many accounts pasting the same text - action the others too
+        if hit.scope == 'global' and message.guild:
+            for user_id in {post.user_id for post in hit.posts} - {message.author.id}:
+                member = message.guild.get_member(user_id)
+                if not member:
+                    continue
+                if 'ban' in rule.actions:
+                    self.dispatcher.ban(member, rule.name, rule.reason, message)
+                elif 'timeout' in rule.actions:
+                    self.dispatcher.timeout(member, rule.timeout_minutes, rule.name, rule.reason, message)
 
     async def check_message(self, message: discord.Message):
         """Main message checking function"""
@@ -97,20 +194,28 @@ class Moderation:
         if message.author.bot:
             return
 
-        # Check for invite links (server-wide)
-        if self.contains_invite_link(message.content):
-            await self.handle_invite_link(message)
+        self.stats['messages'] += 1
+        if self.is_trusted(message.author):
+            self.stats['trusted_skips'] += 1
             return
 
-        # Check for scam domains (server-wide)
-        if self.contains_scam_domain(message.content):
-            await self.handle_scam_domain(message)
-            return
+        # Every message spends tokens and is fingerprinted, even ones a rule will action
+        user_ok = self.user_limiter.hit(message.author.id)
+        channel_ok = self.channel_limiter.hit(message.channel.id)
+
+        # Normalized once, shared by the duplicate fingerprint and the rules
+        normalized = normalize_content(message.content)
+        duplicate = self.duplicate_detector.record(message.author.id, message.channel.id, message.id, message.content,
+                                                   normalized=normalized,
+                                                   guild_id=message.guild.id if message.guild else None)
 
-        # Check channel-specific protections
-        if message.channel.id in config.ORDER_CHANNEL_IDS:
-            print(f"Message in order channel from {message.author}")
-            await self.handle_order_channel(message)
-        elif message.channel.id == config.SUPPORT_CHANNEL_ID:
-            print(f"Message in support channel from {message.author}")
-            await self.handle_support_channel(message) 
\ No newline at end of file
+        role_ids = frozenset(role.id for role in getattr(message.author, 'roles', ()))
+        rule = self.rule_engine.evaluate(message.content, message.channel.id, role_ids, normalized=normalized)
+        if rule:
+            await self.execute_rule(rule, message)
+        elif duplicate:
+            await self.handle_duplicate_hit(duplicate, message)
+        elif not user_ok:
+            await self.execute_rule(self.user_flood_rule, message)
+        elif not channel_ok:
+            await self.execute_rule(self.channel_flood_rule, message)
@@ -0,0 +1,176 @@
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+import aiofiles
+import discord
+import config
+from rate_limiter import TokenBucketLimiter
+
+# guild.query_members accepts at most this many ids per gateway request
+QUERY_BATCH_SIZE = 100
+
+
+def display_name(user) -> str:
+    """A user's global display name (not a per-guild nickname)"""
+    return getattr(user, 'global_name', None) or user.name
+
+
+class NameResolver:
+    """Persistent user id -> display name cache for leaderboards and reports.
+
+    Names come from the client cache when the user is in it and otherwise
+    from names recorded on member events, so members who left keep their
+    name. Ids with no name, or one older than `ttl` seconds, are queued and
+    resolved by one background job: a gateway member query per guild for up
+    to 100 ids at a time, then paced `fetch_user` calls for whoever is no
+    longer in the guild. Lookups never wait on Discord; a caller shows its
+    fallback once and the leaderboard cache re-renders when names arrive.
+    """
+
+    def __init__(self, bot, path: str = None, ttl: float = None, clock=time.time):
+        self.bot = bot
+        self.path = config.NAME_CACHE_FILE if path is None else path
+        self.ttl = config.NAME_CACHE_TTL_SECONDS if ttl is None else ttl
+        self.clock = clock
+        # user id -> [display name or None if the account is gone, resolved at]
+        self.names: Dict[int, List] = {}
+        # guild id -> user ids waiting to be fetched (0 for ids with no guild)
+        self.pending: Dict[int, Set[int]] = {}
+        self.fetch_limiter = TokenBucketLimiter(config.NAME_FETCH_RATE, config.NAME_FETCH_BURST)
+        self.save_task: Optional[asyncio.Task] = None
+        self.stats = {
+            'queried': 0,
+            'fetched': 0,
+            'missing': 0
+        }
+        self.load()
+
+    def load(self):
+        if not self.path:
+            return
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+            self.names = {int(user_id): entry for user_id, entry in data.items()}
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, ValueError, AttributeError) as e:
+            print(f"Ignoring unreadable name cache {self.path}: {e}")
+
+    async def save(self):
+        if not self.path:
+            return
+        data = {str(user_id): entry for user_id, entry in self.names.items()}
+        try:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            async with aiofiles.open(self.path, 'w') as f:
+                await f.write(json.dumps(data, separators=(',', ':')))
+        except OSError as e:
+            print(f"Error saving name cache {self.path}: {e}")
+
+    def schedule_save(self):
+        """Coalesce writes into one per interval"""
+        if self.save_task is None or self.save_task.done():
+            self.save_task = asyncio.get_running_loop().create_task(self.delayed_save())
+
+    async def delayed_save(self):
+        await asyncio.sleep(config.NAME_CACHE_SAVE_SECONDS)
+        await self.save()
+
+    async def close(self):
+        """Persist now instead of waiting for the pending save"""
+        if self.save_task and not self.save_task.done():
+            self.save_task.cancel()
+            await self.save()
+
+    def record(self, user_id: int, name: Optional[str]):
+        """Store a resolved name; re-render leaderboards that showed the old one"""
+        entry = self.names.get(user_id)
+        self.names[user_id] = [name, self.clock()]
+        if entry is None or entry[0] != name:
+            self.bot.data_manager.leaderboard_cache.renamed(str(user_id))
+            self.schedule_save()
+
+    def remember(self, user):
+        """Record a name seen on a member or user event"""
+        self.record(user.id, display_name(user))
+
+    def fresh(self, user_id: int) -> bool:
+        entry = self.names.get(user_id)
+        return entry is not None and self.clock() - entry[1] < self.ttl
+
+    def resolve(self, guild_id: int, user_ids: Iterable[int]) -> Dict[int, str]:
+        """Known names for `user_ids`; unknown or stale ids are fetched in the background"""
+        names = {}
+        queued = False
+        for user_id in user_ids:
+            user = self.bot.get_user(user_id)
+            if user is not None:
+                name = display_name(user)
+                entry = self.names.get(user_id)
+                if entry is None or entry[0] != name:
+                    self.record(user_id, name)
+                names[user_id] = name
+                continue
+            entry = self.names.get(user_id)
+            if entry is not None and entry[0] is not None:
+                names[user_id] = entry[0]
+            if not self.fresh(user_id):
+                self.pending.setdefault(guild_id or 0, set()).add(user_id)
+                queued = True
+        if queued:
+            self.bot.jobs.submit("name_resolution", self.fetch_pending)
+        return names
+
+    async def fetch_pending(self):
+        """Resolve queued ids until none are left"""
+        while self.pending:
+            guild_id, user_ids = self.pending.popitem()
+            # Resolved by an event or another guild's batch while waiting
+            user_ids = [user_id for user_id in user_ids if not self.fresh(user_id)]
+            guild = self.bot.get_guild(guild_id) if guild_id else None
+            if guild is not None:
+                user_ids = await self.query_guild(guild, user_ids)
+            for user_id in user_ids:
+                await self.fetch_user(user_id)
+
+    async def query_guild(self, guild: discord.Guild, user_ids: List[int]) -> List[int]:
+        """Resolve current members in batches over the gateway; return the ids not found"""
+        missing = []
+        for start in range(0, len(user_ids), QUERY_BATCH_SIZE):
+            batch = user_ids[start:start + QUERY_BATCH_SIZE]
+            try:
+                members = await guild.query_members(user_ids=batch, limit=len(batch), cache=False)
+            except (asyncio.TimeoutError, discord.ClientException) as e:
+                print(f"Member name query failed in guild {guild.id}: {e}")
+                members = []
+            self.stats['queried'] += 1
+            found = set()
+            for member in members:
+                self.remember(member)
+                found.add(member.id)
+            missing.extend(user_id for user_id in batch if user_id not in found)
+        return missing
+
+    async def fetch_user(self, user_id: int):
+        """Look up one user over REST, paced by the fetch limiter"""
+        delay = self.fetch_limiter.reserve('fetch_user')
+        if delay:
+            await asyncio.sleep(delay)
+        try:
+            user = await self.bot.fetch_user(user_id)
+        except discord.NotFound:
+            # Deleted account: keep the fallback until the entry goes stale
+            self.stats['missing'] += 1
+            self.record(user_id, None)
+            return
+        except discord.HTTPException as e:
+            print(f"Error fetching user {user_id}: {e}")
+            return
+        self.stats['fetched'] += 1
+        self.remember(user)
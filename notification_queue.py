@@ -0,0 +1,113 @@
+import asyncio
+import time
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import discord
+from rate_limiter import RecentKeys, TokenBucketLimiter
+
+
+class Notice(NamedTuple):
+    member: discord.Member
+    embed: discord.Embed
+    muted: bool
+    queued_at: float
+
+
+class NotificationQueue:
+    """Paced mute/unmute DMs, coalesced per guild member.
+
+    A notice waits `coalesce_seconds` before it is sent. A newer notice for
+    the same state in the same guild replaces it in place; one for the
+    opposite state cancels it, since a role flip-flop leaves the member where
+    they started. Members whose DMs turned out to be closed (a per-server
+    privacy setting) are remembered for `closed_seconds` and skipped without
+    a REST call.
+    """
+
+    def __init__(self, coalesce_seconds: float = 5.0, rate: float = 1.0, burst: int = 5,
+                 closed_seconds: float = 86400.0, max_closed: int = 10000, clock=time.monotonic):
+        self.coalesce_seconds = coalesce_seconds
+        self.clock = clock
+        self.limiter = TokenBucketLimiter(rate, burst, clock=clock)
+        self.closed_dms = RecentKeys(closed_seconds, max_closed, clock=clock)
+        # (guild id, member id) -> notice
+        self.pending: Dict[Tuple[int, int], Notice] = {}
+        self.worker: Optional[asyncio.Task] = None
+        self.wakeup: Optional[asyncio.Event] = None
+        self.stats = {
+            'queued': 0,
+            'replaced': 0,
+            'cancelled': 0,
+            'sent': 0,
+            'skipped_closed': 0,
+            'failed': 0
+        }
+
+    def ensure_started(self):
+        """Start the sender on first use (needs a running event loop)"""
+        if self.worker is None:
+            self.wakeup = asyncio.Event()
+            self.worker = asyncio.get_running_loop().create_task(self.send_loop())
+
+    def notify(self, member: discord.Member, embed: discord.Embed, muted: bool):
+        """Queue a mute (muted=True) or unmute notice without waiting on Discord"""
+        key = (member.guild.id, member.id)
+        if key in self.closed_dms:
+            self.stats['skipped_closed'] += 1
+            return
+        self.ensure_started()
+
+        queued = self.pending.get(key)
+        if queued is not None:
+            if queued.muted != muted:
+                del self.pending[key]
+                self.stats['cancelled'] += 1
+                return
+            self.pending[key] = queued._replace(member=member, embed=embed)
+            self.stats['replaced'] += 1
+            return
+
+        self.pending[key] = Notice(member, embed, muted, self.clock())
+        self.stats['queued'] += 1
+        self.wakeup.set()
+
+    async def send_loop(self):
+        while True:
+            if not self.pending:
+                self.wakeup.clear()
+                await self.wakeup.wait()
+                continue
+
+            # Oldest first; it is the first to leave its coalescing window
+            key, notice = next(iter(self.pending.items()))
+            wait = notice.queued_at + self.coalesce_seconds - self.clock()
+            if wait > 0:
+                await asyncio.sleep(wait)
+                continue
+            delay = self.limiter.reserve('dm')
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # It may have been replaced or cancelled while we were paced
+            notice = self.pending.pop(key, None)
+            if notice is not None:
+                await self.send(notice)
+
+    async def send(self, notice: Notice):
+        member = notice.member
+        try:
+            await member.send(embed=notice.embed)
+            self.stats['sent'] += 1
+        except discord.Forbidden:
+            self.closed_dms.add((member.guild.id, member.id))
+            self.stats['skipped_closed'] += 1
+            print(f"Cannot send DM to {member} - DMs closed")
+        except Exception as e:
+            self.stats['failed'] += 1
+            print(f"Error sending DM to {member}: {e}")
+
+    async def close(self):
+        """Stop the sender; unsent notices are dropped"""
+        if self.worker:
+            self.worker.cancel()
+            await asyncio.gather(self.worker, return_exceptions=True)
+            self.worker = None
@@ -0,0 +1,133 @@
+import time
+from collections import OrderedDict
+from typing import Hashable, List, Optional
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets with lazy refill and idle-entry eviction.
+
+    Each key maps to a two-item list `[tokens, last_seen]` in an OrderedDict.
+    Tokens are topped up from the elapsed time when a key is hit, so there
+    are no timers per user. Hit keys are moved to the end, which keeps the
+    buckets ordered by last use, and eviction pops idle entries from the
+    front; both are O(1) per key (OrderedDict is a linked list, unlike a
+    plain dict, whose front fills with deleted slots).
+    """
+
+    def __init__(self, rate: float, burst: float, idle_seconds: float = 300.0, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.idle_seconds = idle_seconds
+        self.clock = clock
+        self.buckets: 'OrderedDict[Hashable, List[float]]' = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0 and self.burst > 0
+
+    def hit(self, key: Hashable, cost: float = 1.0, now: Optional[float] = None) -> bool:
+        """Consume tokens for `key`; return False when it is over the limit"""
+        if not self.enabled:
+            return True
+        if now is None:
+            now = self.clock()
+
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [self.burst, now]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self.buckets.move_to_end(key)
+
+        self.evict_idle(now)
+
+        if bucket[0] >= cost:
+            bucket[0] -= cost
+            return True
+        return False
+
+    def reserve(self, key: Hashable, cost: float = 1.0, now: Optional[float] = None) -> float:
+        """Consume tokens for `key`, going into debt if needed.
+
+        Returns how many seconds the caller should wait before acting, which
+        lets a worker pace calls with one sleep instead of polling.
+        """
+        if not self.enabled:
+            return 0.0
+        if now is None:
+            now = self.clock()
+
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = [self.burst, now]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            self.buckets.move_to_end(key)
+
+        self.evict_idle(now)
+
+        bucket[0] -= cost
+        return 0.0 if bucket[0] >= 0 else -bucket[0] / self.rate
+
+    def evict_idle(self, now: Optional[float] = None):
+        """Drop keys that have not been hit for `idle_seconds`"""
+        if now is None:
+            now = self.clock()
+        buckets = self.buckets
+        cutoff = now - self.idle_seconds
+        while buckets:
+            key = next(iter(buckets))
+            if buckets[key][1] > cutoff:
+                break
+            buckets.popitem(last=False)
+
+    def reset(self, key: Hashable):
+        """Forget a key (e.g. after it has been actioned)"""
+        self.buckets.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self.buckets)
+
+
+class RecentKeys:
+    """Keys seen within a TTL, bounded to `max_keys`.
+
+    Keys stay in insertion order in an OrderedDict, so expired (or, when
+    full, the oldest) entries are popped from the front in O(1). A key is
+    not refreshed by repeat adds, so `add` returns True at most once per TTL.
+    """
+
+    def __init__(self, ttl: float, max_keys: int = 100000, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.clock = clock
+        self.keys: 'OrderedDict[Hashable, float]' = OrderedDict()
+
+    def add(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """Remember a key; return False if it was already recent"""
+        if now is None:
+            now = self.clock()
+        cutoff = now - self.ttl
+        keys = self.keys
+        while keys:
+            oldest = next(iter(keys))
+            if keys[oldest] > cutoff and len(keys) < self.max_keys:
+                break
+            keys.popitem(last=False)
+        if key in keys:
+            return False
+        keys[key] = now
+        return True
+
+    def discard(self, key: Hashable):
+        """Forget a key so the next `add` for it returns True"""
+        self.keys.pop(key, None)
+
+    def __contains__(self, key: Hashable) -> bool:
+        added = self.keys.get(key)
+        return added is not None and added > self.clock() - self.ttl
+
+    def __len__(self) -> int:
+        return len(self.keys)
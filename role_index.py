@@ -0,0 +1,100 @@
+from typing import Dict, FrozenSet, Iterable, Set
+
+import discord
+
+
+class RoleIndex:
+    """Role id -> member ids per guild, kept current from member events.
+
+    `has_role` is a set lookup for indexed guilds instead of a scan over
+    `member.roles` (which discord.py rebuilds and sorts on every access).
+    Members the index has not seen yet fall back to their own roles.
+    """
+
+    def __init__(self):
+        # guild id -> role id -> member ids
+        self.roles: Dict[int, Dict[int, Set[int]]] = {}
+        # guild id -> every indexed member id
+        self.members: Dict[int, Set[int]] = {}
+
+    def build(self, guild: discord.Guild):
+        """(Re)index every cached member of a guild"""
+        roles: Dict[int, Set[int]] = {}
+        members: Set[int] = set()
+        for member in guild.members:
+            members.add(member.id)
+            for role_id in self.role_ids(member):
+                roles.setdefault(role_id, set()).add(member.id)
+        self.roles[guild.id] = roles
+        self.members[guild.id] = members
+
+    def ensure_guild(self, guild: discord.Guild):
+        """Index a guild on first use"""
+        if guild.id not in self.members:
+            self.build(guild)
+
+    def forget_guild(self, guild: discord.Guild):
+        self.roles.pop(guild.id, None)
+        self.members.pop(guild.id, None)
+
+    @staticmethod
+    def role_ids(member) -> FrozenSet[int]:
+        """A member's role ids, without @everyone"""
+        guild_id = member.guild.id
+        return frozenset(role.id for role in member.roles if role.id != guild_id)
+
+    def add_member(self, member: discord.Member):
+        roles = self.roles.get(member.guild.id)
+        if roles is None:
+            return
+        self.members[member.guild.id].add(member.id)
+        for role_id in self.role_ids(member):
+            roles.setdefault(role_id, set()).add(member.id)
+
+    def remove_member(self, member: discord.Member):
+        roles = self.roles.get(member.guild.id)
+        if roles is None:
+            return
+        self.members[member.guild.id].discard(member.id)
+        for role_id in self.role_ids(member):
+            holders = roles.get(role_id)
+            if holders is not None:
+                holders.discard(member.id)
+
+    def update_member(self, before: discord.Member, after: discord.Member):
+        """Apply the role difference between two member states"""
+        roles = self.roles.get(after.guild.id)
+        if roles is None:
+            return
+        members = self.members[after.guild.id]
+        if after.id not in members:
+            # Not indexed yet (e.g. joined before the index was built): nothing to diff against
+            self.add_member(after)
+            return
+        old, new = self.role_ids(before), self.role_ids(after)
+        for role_id in old - new:
+            holders = roles.get(role_id)
+            if holders is not None:
+                holders.discard(after.id)
+        for role_id in new - old:
+            roles.setdefault(role_id, set()).add(after.id)
+
+    def has_role(self, member, role_id: int) -> bool:
+        guild = getattr(member, 'guild', None)
+        if guild is None:
+            return False
+        if member.id in self.members.get(guild.id, ()):
+            return member.id in self.roles[guild.id].get(role_id, ())
+        return any(role.id == role_id for role in member.roles)
+
+    def has_any_role(self, member, role_ids: Iterable[int]) -> bool:
+        return any(self.has_role(member, role_id) for role_id in role_ids)
+
+    def members_with(self, guild: discord.Guild, role_id: int) -> Set[int]:
+        """Ids of members holding a role (the live set - copy before mutating)"""
+        self.ensure_guild(guild)
+        return self.roles[guild.id].get(role_id, set())
+
+    def member_ids(self, guild: discord.Guild) -> Set[int]:
+        self.ensure_guild(guild)
+        return self.members[guild.id]
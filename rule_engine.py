@@ -0,0 +1,246 @@
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional
+
+import config
+from domain_matcher import DomainMatcher, extract_hosts, normalize_host
+from text_normalizer import find_invite_link, may_contain_link, normalize_content
+
+VALID_ACTIONS = {'delete', 'ban', 'timeout', 'notify', 'log'}
+
+# Leading global flags like "(?i)" - only valid at the start of the combined pattern
+_GLOBAL_FLAGS = re.compile(r'^\(\?([aiLmsux]+)\)')
+# Numbered backreferences point at the wrong group once patterns are combined
+_NUMBERED_BACKREF = re.compile(r'(?<!\\)(?:\\\\)*\\[1-9]')
+
+# Built-in detectors rules can reference by name. Each runs at most once per
+# message no matter how many rules use it.
+DETECTORS = {
+    'invite_link': find_invite_link
+}
+
+# Rules used when no rules file is present - mirrors moderation_rules.json
+DEFAULT_RULES = [
+    {
+        "name": "invite_link",
+        "detector": "invite_link",
+        "actions": ["ban", "log"],
+        "reason": "Posted Discord invite link"
+    },
+    {
+        "name": "scam_domain",
+        "blocklist": True,
+        "actions": ["delete", "ban", "log"],
+        "reason": "Posted scam/malicious domain"
+    },
+    {
+        "name": "order_channel",
+        "channels": ["ORDER_CHANNEL_IDS"],
+        "actions": ["delete", "notify"],
+        "notice": "Please use `/order` in order channels or `/ticket` in ticket channels."
+    },
+    {
+        "name": "support_channel",
+        "channels": ["SUPPORT_CHANNEL_ID"],
+        "actions": ["delete", "notify"],
+        "notice": "Please use `/order` in order channels or `/ticket` in ticket channels."
+    }
+]
+
+
+@dataclass
+class Rule:
+    """A single compiled moderation rule"""
+    index: int
+    name: str
+    actions: List[str]
+    pattern: Optional[str] = None
+    detector: Optional[str] = None
+    domains: List[str] = field(default_factory=list)
+    blocklist: bool = False
+    channels: FrozenSet[int] = frozenset()
+    exempt_roles: FrozenSet[int] = frozenset()
+    reason: str = ""
+    notice: str = ""
+    timeout_minutes: int = 10
+
+    @property
+    def matches_all(self) -> bool:
+        """Rules without content matchers apply to every message in scope"""
+        return not self.pattern and not self.detector and not self.domains and not self.blocklist
+
+    def applies_to(self, channel_id: int, role_ids: FrozenSet[int]) -> bool:
+        """Check channel scope and role exemptions"""
+        if self.channels and channel_id not in self.channels:
+            return False
+        return not (self.exempt_roles and self.exempt_roles & role_ids)
+
+
+def _resolve_ids(values: Iterable) -> FrozenSet[int]:
+    """Resolve ids, allowing config names like "ORDER_CHANNEL_IDS" """
+    ids = set()
+    for value in values or []:
+        if isinstance(value, str) and not value.isdigit():
+            value = getattr(config, value, None)
+            if value is None:
+                continue
+        if isinstance(value, (list, tuple, set)):
+            ids.update(int(v) for v in value)
+        elif value:
+            ids.add(int(value))
+    return frozenset(ids)
+
+
+def load_rules(path: str) -> List[dict]:
+    """Load rule definitions from a JSON file, falling back to the defaults"""
+    if path and os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)['rules']
+        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            print(f"Error loading moderation rules from {path}: {e} - using defaults")
+    return DEFAULT_RULES
+
+
+class RuleEngine:
+    """Compiles a rule set into a single pass over each message.
+
+    All regex rules are merged into one alternation with a named group per
+    rule, built-in detectors run once each, hosts are extracted once and
+    looked up in one trie, and
+    channel-wide rules are indexed by channel id. Adding rules grows the
+    compiled structures, not the number of passes over the content. When
+    several rules match, the one listed first wins. Patterns are matched
+    against normalized content (see text_normalizer.normalize_content).
+    """
+
+    def __init__(self, rule_defs: List[dict], blocklist: Optional[DomainMatcher] = None):
+        self.rules: List[Rule] = []
+        self.blocklist = blocklist
+        self.blocklist_rule: Optional[Rule] = None
+        self.rule_domains = DomainMatcher(allowed=config.ALLOWED_DOMAINS)
+        self.domain_owners: Dict[str, int] = {}
+        self.global_rules: List[Rule] = []
+        self.channel_rules: Dict[int, List[Rule]] = {}
+        self.detector_rules: Dict[str, List[Rule]] = {}
+        self.pattern = None
+        self.compile(rule_defs)
+
+    def compile(self, rule_defs: List[dict]):
+        """Build the combined matchers from rule definitions"""
+        alternatives = []
+        for definition in rule_defs:
+            actions = [a for a in definition.get('actions', []) if a in VALID_ACTIONS]
+            unknown = set(definition.get('actions', [])) - VALID_ACTIONS
+            if unknown:
+                print(f"Rule {definition.get('name')}: ignoring unknown actions {sorted(unknown)}")
+
+            rule = Rule(
+                index=len(self.rules),
+                name=definition.get('name', f"rule_{len(self.rules)}"),
+                actions=actions,
+                pattern=definition.get('pattern'),
+                detector=definition.get('detector'),
+                domains=definition.get('domains', []),
+                blocklist=bool(definition.get('blocklist')),
+                channels=_resolve_ids(definition.get('channels')),
+                exempt_roles=_resolve_ids(definition.get('exempt_roles')),
+                reason=definition.get('reason', definition.get('name', '')),
+                notice=definition.get('notice', ''),
+                timeout_minutes=int(definition.get('timeout_minutes', 10))
+            )
+
+            if rule.detector and rule.detector not in DETECTORS:
+                print(f"Rule {rule.name}: unknown detector {rule.detector} - skipped")
+                continue
+
+            if rule.pattern:
+                if _NUMBERED_BACKREF.search(rule.pattern):
+                    print(f"Rule {rule.name}: numbered backreferences are not supported, use (?P<name>...) and (?P=name) - skipped")
+                    continue
+                # Scope leading flags to this rule so they can sit mid-alternation
+                pattern = _GLOBAL_FLAGS.sub(lambda m: f"(?{m.group(1)}:", rule.pattern, count=1)
+                if pattern != rule.pattern:
+                    pattern += ")"
+                alternative = f"(?P<r{rule.index}>{pattern})"
+                # Compile as combined, so a pattern that only breaks the alternation is caught here
+                try:
+                    re.compile('|'.join(alternatives + [alternative]))
+                except re.error as e:
+                    print(f"Rule {rule.name}: invalid pattern ({e}) - skipped")
+                    continue
+                alternatives.append(alternative)
+
+            if rule.detector:
+                self.detector_rules.setdefault(rule.detector, []).append(rule)
+
+            for domain in rule.domains:
+                # Keyed like the hosts checked against it ("Evil.COM." -> "evil.com")
+                host = normalize_host(domain)
+                if host:
+                    self.rule_domains.blocked.add(host)
+                    self.domain_owners.setdefault(host, rule.index)
+
+            if rule.blocklist and self.blocklist_rule is None:
+                self.blocklist_rule = rule
+
+            if rule.matches_all:
+                if rule.channels:
+                    for channel_id in rule.channels:
+                        self.channel_rules.setdefault(channel_id, []).append(rule)
+                else:
+                    self.global_rules.append(rule)
+
+            self.rules.append(rule)
+
+        self.pattern = re.compile('|'.join(alternatives)) if alternatives else None
+
+    def content_rules(self, content: str) -> Iterable[Rule]:
+        """Yield rules matched by normalized message content"""
+        if self.pattern is not None:
+            for match in self.pattern.finditer(content):
+                yield self.rules[int(match.lastgroup[1:])]
+
+        for detector, rules in self.detector_rules.items():
+            if DETECTORS[detector](content):
+                yield from rules
+
+        if (self.domain_owners or self.blocklist_rule is not None) and '.' in content:
+            for host in extract_hosts(content):
+                if self.domain_owners:
+                    owner = self.domain_owners.get(self.rule_domains.check_host(host))
+                    if owner is not None:
+                        yield self.rules[owner]
+                if self.blocklist_rule is not None and self.blocklist is not None:
+                    if self.blocklist.check_host(host) is not None:
+                        yield self.blocklist_rule
+
+    def evaluate(self, content: str, channel_id: int, role_ids: FrozenSet[int] = frozenset(),
+                 normalized: Optional[str] = None) -> Optional[Rule]:
+        """Return the highest-priority rule matching a message, if any.
+
+        Pass `normalized` when the caller already ran normalize_content.
+        """
+        best = None
+        # Without custom patterns, text with nothing dot-like cannot hold a
+        # link or invite, so most chat skips normalization entirely
+        if self.pattern is not None or may_contain_link(content):
+            if normalized is None:
+                normalized = normalize_content(content)
+            best = self._pick(self.content_rules(normalized), channel_id, role_ids, best)
+        if self.global_rules:
+            best = self._pick(self.global_rules, channel_id, role_ids, best)
+        scoped = self.channel_rules.get(channel_id)
+        if scoped:
+            best = self._pick(scoped, channel_id, role_ids, best)
+        return best
+
+    @staticmethod
+    def _pick(rules: Iterable[Rule], channel_id: int, role_ids: FrozenSet[int], best: Optional[Rule]) -> Optional[Rule]:
+        """Keep the lowest-index applicable rule"""
+        for rule in rules:
+            if (best is None or rule.index < best.index) and rule.applies_to(channel_id, role_ids):
+                best = rule
+        return best
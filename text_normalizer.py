@@ -0,0 +1,163 @@
+import re
+import unicodedata
+
+# Invisible characters used to split up words and links
+ZERO_WIDTH_CHARS = (
+    '\u00ad\u180e\u200b\u200c\u200d\u200e\u200f'
+    '\u2060\u2061\u2062\u2063\u2064\ufeff'
+)
+
+# Markdown decoration that can be wedged inside links (`disc**ord**.gg`,
+# `||discord.gg/abc||`) without changing how Discord renders them
+MARKDOWN_CHARS = '*_~|`\\'
+
+# Common Cyrillic/Greek lookalikes of Latin letters that NFKC leaves alone.
+# Folded only for the invite and host scans, so rule patterns written in
+# Cyrillic or Greek still match the text as typed.
+CONFUSABLES = {
+    'а': 'a', 'в': 'b', 'с': 'c', 'е': 'e', 'һ': 'h', 'і': 'i', 'ј': 'j',
+    'к': 'k', 'м': 'm', 'н': 'h', 'о': 'o', 'р': 'p', 'ѕ': 's', 'т': 't',
+    'х': 'x', 'у': 'y', 'ԁ': 'd', 'ɡ': 'g', 'ӏ': 'l',
+    'А': 'A', 'В': 'B', 'С': 'C', 'Е': 'E', 'Н': 'H', 'І': 'I', 'Ј': 'J',
+    'К': 'K', 'М': 'M', 'О': 'O', 'Р': 'P', 'Ѕ': 'S', 'Т': 'T', 'Х': 'X',
+    'Υ': 'Y', 'α': 'a', 'ο': 'o', 'ν': 'v', 'ι': 'i', 'κ': 'k', 'ρ': 'p',
+    'τ': 't', 'Ο': 'O', 'Α': 'A', 'Β': 'B', 'Ε': 'E', 'Κ': 'K', 'Μ': 'M',
+    'Ν': 'N', 'Ρ': 'P', 'Τ': 'T', 'Χ': 'X', 'Ζ': 'Z',
+    # Ideographic full stops act as dots in hostnames
+    '\u3002': '.', '\uff61': '.',
+}
+
+_MARKDOWN_BYTES = MARKDOWN_CHARS.encode('ascii')
+# Only markers Discord would render are removed: paired emphasis, underline,
+# strikethrough, spoilers and code spans (single `_` only at word edges,
+# like the client). A lone `my_site.com` or `a|b` is left as typed, and so
+# are escaped markers (`\*`), which lose just their backslash.
+_MARKDOWN_REGEX = re.compile(
+    r'(?<!\\)(\*{1,3}|__|~~|\|\||`+)(?=\S)(.+?)(?<=\S)(?<!\\)\1'
+    r'|(?<![\w\\])_(?=\S)(.+?)(?<=\S)(?<!\\)_(?!\w)'
+)
+_ESCAPE_REGEX = re.compile(r'\\([^\w\s]|_)')
+# Nested markers (`**||x||**`) unwrap one level per pass
+_MARKDOWN_PASSES = 3
+_ZERO_WIDTH_REGEX = re.compile('[' + ZERO_WIDTH_CHARS + ']')
+# A regex finds the rare hit faster than str.translate walks every character
+_CONFUSABLES_REGEX = re.compile('[' + ''.join(CONFUSABLES) + ']')
+_is_normalized = unicodedata.is_normalized
+
+# The ideographic full stop is the one dot-like character NFKC keeps;
+# the others (fullwidth, halfwidth, one-dot leader...) normalize to a dot
+IDEOGRAPHIC_STOP = '\u3002'
+# The only character NFKC turns into the `/` an invite needs (`℅` and
+# friends expand to `c/o`, which no invite host ends in)
+FULLWIDTH_SOLIDUS = '\uff0f'
+
+# Discord invite links in every form the client accepts. Applied to
+# normalized content; no whitespace is allowed inside the link, which
+# would otherwise match prose like "on discord. Me / you?".
+INVITE_PATTERN = (
+    r'(?i:(?:discord(?:app)?\.com/invite|discord\.(?:gg|io|me|li)|dsc\.gg)'
+    r'/[a-z0-9-]+)'
+)
+INVITE_REGEX = re.compile(INVITE_PATTERN)
+# Case-sensitive twin for lowercased text, cheaper than the (?i) search
+_LOWER_INVITE_REGEX = re.compile(INVITE_PATTERN[4:-1])
+
+
+def normalize_content(content: str) -> str:
+    """Strip obfuscation from a message once so every check sees clean text.
+
+    Removes rendered markdown decoration and, for non-ASCII messages,
+    zero-width characters and compatibility forms (fullwidth letters, math
+    alphanumerics). Homoglyphs are left for `fold_confusables`. Plain ASCII
+    chat with no markdown characters is returned as-is after a bytes-level
+    check.
+    """
+    if content.isascii():
+        raw = content.encode('ascii')
+        if len(raw.translate(None, _MARKDOWN_BYTES)) == len(raw):
+            return content
+    else:
+        if not unicodedata.is_normalized('NFKC', content):
+            content = unicodedata.normalize('NFKC', content)
+        content = _ZERO_WIDTH_REGEX.sub('', content)
+        if not _has_markdown(content):
+            return content
+    return strip_markdown(content)
+
+
+def fold_confusables(content: str) -> str:
+    """Map common Cyrillic/Greek lookalikes to Latin for link and host scans"""
+    if content.isascii():
+        return content
+    return _CONFUSABLES_REGEX.sub(lambda match: CONFUSABLES[match.group()], content)
+
+
+def strip_markdown(content: str) -> str:
+    """Unwrap paired markdown markers and escapes, keeping their text"""
+    for _ in range(_MARKDOWN_PASSES):
+        stripped = _MARKDOWN_REGEX.sub(lambda match: match.group(2) or match.group(3), content)
+        if stripped == content:
+            break
+        content = stripped
+    return _ESCAPE_REGEX.sub(r'\1', content)
+
+
+def may_contain_link(content: str) -> bool:
+    """Cheap gate: links and invites need a dot, before or after normalizing"""
+    if '.' in content:
+        return True
+    if content.isascii():
+        return False
+    return IDEOGRAPHIC_STOP in content or not _is_normalized('NFKC', content)
+
+
+def _has_markdown(content: str) -> bool:
+    # Chained `in` checks beat a regex or a generator over MARKDOWN_CHARS
+    return ('*' in content or '_' in content or '~' in content or '|' in content
+            or '`' in content or '\\' in content)
+
+
+def find_invite_link(content: str):
+    """Find a Discord invite in normalized content.
+
+    Confusables are folded first. The match is taken on the lowercased text,
+    which callers only test for presence.
+    """
+    content = fold_confusables(content)
+    if '.' not in content:
+        return None
+    # Substring checks are far cheaper than any regex search
+    lowered = content.lower()
+    if 'discord' not in lowered and 'dsc' not in lowered:
+        return None
+    return _LOWER_INVITE_REGEX.search(lowered)
+
+
+def find_invite_in(content: str):
+    """Find a Discord invite in raw message content.
+
+    Normalizes only messages that could hold one: every invite has a `/`
+    and a `.`, and ASCII text also needs `disc` or `dsc` once markdown
+    characters are dropped. Plain ASCII skips normalization altogether, so
+    typical chat costs less than one regex search.
+    """
+    if '/' not in content and FULLWIDTH_SOLIDUS not in content:
+        return None
+    if content.isascii():
+        if '.' not in content or ('d' not in content and 'D' not in content):
+            return None
+        lowered = content.lower()
+        # _has_markdown, inlined: this runs for every link someone posts
+        if not ('*' in content or '_' in content or '~' in content or '|' in content
+                or '`' in content or '\\' in content):
+            if 'disc' in lowered or 'dsc' in lowered:
+                return _LOWER_INVITE_REGEX.search(lowered)
+            return None
+        # Markdown or escapes can still split the name (`di**sc**ord.gg`)
+        unmarked = lowered.encode('ascii').translate(None, _MARKDOWN_BYTES)
+        if b'disc' not in unmarked and b'dsc' not in unmarked:
+            return None
+        return find_invite_link(strip_markdown(content))
+    if '.' not in content and IDEOGRAPHIC_STOP not in content and _is_normalized('NFKC', content):
+        return None
+    return find_invite_link(normalize_content(content))
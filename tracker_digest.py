@@ -0,0 +1,115 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from rate_limiter import TokenBucketLimiter
+
+
+@dataclass
+class Digest:
+    """Joins and leaves collected for one guild's summary post"""
+    joins: int = 0
+    leaves: int = 0
+    # inviter id -> [joins, leaves]
+    inviters: Dict[int, List[int]] = field(default_factory=dict)
+    started_at: float = field(default_factory=time.monotonic)
+
+    def add(self, inviter_id: int, joined: bool):
+        counts = self.inviters.setdefault(inviter_id, [0, 0])
+        if joined:
+            self.joins += 1
+            counts[0] += 1
+        else:
+            self.leaves += 1
+            counts[1] += 1
+
+    @property
+    def total(self) -> int:
+        return self.joins + self.leaves
+
+    def top_inviters(self, limit: int = 10) -> List[tuple]:
+        """(inviter id, joins, leaves), busiest first"""
+        ranked = sorted(self.inviters.items(), key=lambda item: item[1][0] + item[1][1], reverse=True)
+        return [(inviter_id, joins, leaves) for inviter_id, (joins, leaves) in ranked[:limit]]
+
+
+class TrackerDigest:
+    """Per-event tracker posts while traffic is low, one summary per window during bursts.
+
+    Each guild may post `threshold` events per `window_seconds` on their own
+    (a token bucket, so quiet servers see every join immediately). Events
+    over that budget are collected into a Digest that `flush` receives once
+    the window ends; while a digest is collecting, later events join it
+    rather than posting on their own. A window of 0 disables digests.
+    """
+
+    def __init__(self, flush: Callable[[int, Digest], Awaitable], window_seconds: float = 60.0,
+                 threshold: int = 5, clock=time.monotonic):
+        self.flush = flush
+        self.window_seconds = window_seconds
+        self.clock = clock
+        self.limiter = TokenBucketLimiter(threshold / window_seconds if window_seconds > 0 else 0, threshold,
+                                          idle_seconds=max(300.0, window_seconds), clock=clock)
+        self.pending: Dict[int, Digest] = {}
+        self.flush_tasks: Dict[int, asyncio.Task] = {}
+        self.stats = {
+            'posted': 0,
+            'digested': 0,
+            'digests': 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_seconds > 0
+
+    def admit(self, guild_id: int) -> bool:
+        """True if this event should get its own message"""
+        if not self.enabled:
+            return True
+        # A threshold of 0 digests everything
+        if guild_id in self.pending or self.limiter.burst <= 0 or not self.limiter.hit(guild_id):
+            return False
+        self.stats['posted'] += 1
+        return True
+
+    def add(self, guild_id: int, inviter_id: int, joined: bool):
+        """Collect an event that was not admitted into the guild's digest"""
+        digest = self.pending.get(guild_id)
+        if digest is None:
+            digest = self.pending[guild_id] = Digest(started_at=self.clock())
+            self.flush_tasks[guild_id] = asyncio.get_running_loop().create_task(self.flush_later(guild_id))
+        digest.add(inviter_id, joined)
+        self.stats['digested'] += 1
+
+    async def flush_later(self, guild_id: int):
+        await asyncio.sleep(self.window_seconds)
+        self.flush_tasks.pop(guild_id, None)
+        await self.flush_guild(guild_id)
+
+    async def flush_guild(self, guild_id: int):
+        digest: Optional[Digest] = self.pending.pop(guild_id, None)
+        if digest is None:
+            return
+        self.stats['digests'] += 1
+        try:
+            await self.flush(guild_id, digest)
+        except Exception as e:
+            print(f"Error posting tracker digest for guild {guild_id}: {e}")
+
+    def forget_guild(self, guild_id: int):
+        """Drop a guild's collecting digest without posting it"""
+        self.pending.pop(guild_id, None)
+        task = self.flush_tasks.pop(guild_id, None)
+        if task:
+            task.cancel()
+
+    async def close(self):
+        """Post every collecting digest now instead of at the end of its window"""
+        tasks = list(self.flush_tasks.values())
+        self.flush_tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for guild_id in list(self.pending):
+            await self.flush_guild(guild_id)
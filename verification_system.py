@@ -1,158 +1,440 @@
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, Optional, Tuple
+import aiofiles
 import discord
 from discord.ext import commands
 import config
+from notification_queue import NotificationQueue
+from rate_limiter import TokenBucketLimiter
+
+SCAN_JOB = "verification_scan"
+
+
+def scan_job(guild_id: int) -> str:
+    """Job runner name for a guild's scan"""
+    return f"{SCAN_JOB}:{guild_id}"
+
+# Snapshot state bits per member
+STATE_VERIFIED = 1
+STATE_MUTED = 2
+# Verified and unmuted, or unverified and muted; anything else needs a role change
+COMPLIANT_STATES = frozenset({STATE_VERIFIED, STATE_MUTED})
+
+
+
+@dataclass
+class ScanProgress:
+    """Counters for a running or finished member scan"""
+    total: int = 0
+    processed: int = 0
+    muted: int = 0
+    unmuted: int = 0
+    errors: int = 0
+    unchanged: int = 0
+    left: int = 0
+    cancelled: bool = False
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+
+    def finish(self):
+        if self.finished_at is None:
+            self.finished_at = time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished_at or time.monotonic()) - self.started_at
+
+    @property
+    def rate(self) -> float:
+        """Members processed per second"""
+        return self.processed / self.elapsed if self.elapsed > 0 else 0.0
+
+    def summary(self) -> str:
+        return (f"{self.processed}/{self.total} processed ({self.unchanged} unchanged, {self.left} left), "
+                f"{self.muted} muted, {self.unmuted} unmuted, {self.errors} errors "
+                f"in {self.elapsed:.0f}s ({self.rate:.1f}/s)")
+
 
 class VerificationSystem:
     def __init__(self, bot):
         self.bot = bot
+        # Progress of each guild's latest scan; the scans themselves run on the bot's job runner
+        self.scan_progress: Dict[int, ScanProgress] = {}
+        # Role edits share one bucket per guild across all scan workers
+        self.scan_limiter = TokenBucketLimiter(config.SCAN_RATE, config.SCAN_BURST)
+        # Mute/unmute DMs are coalesced per member and paced off the event handlers
+        self.notifications = NotificationQueue(
+            coalesce_seconds=config.NOTIFY_COALESCE_SECONDS,
+            rate=config.NOTIFY_DM_RATE,
+            burst=config.NOTIFY_DM_BURST,
+            closed_seconds=config.NOTIFY_DMS_CLOSED_SECONDS
+        )
+        # Last known (verified, muted) state per guild and member id, persisted between restarts
+        self.snapshot_file = config.VERIFICATION_SNAPSHOT_FILE
+        self.snapshot: Dict[int, Dict[int, int]] = {}
+        self.snapshot_save_task: Optional[asyncio.Task] = None
+        self.load_snapshot()
+
+    def load_snapshot(self):
+        """Load the member state snapshot written after the last scan"""
+        try:
+            with open(self.snapshot_file, 'r') as f:
+                data = json.load(f)
+            if 'guilds' not in data:
+                # Written before guild partitioning: a single guild's members
+                data = {'guilds': {data.get('guild_id', 0): data.get('members', {})}}
+            self.snapshot = {
+                int(guild_id): {int(member_id): state for member_id, state in members.items()}
+                for guild_id, members in data['guilds'].items()
+            }
+        except FileNotFoundError:
+            pass
+        except (json.JSONDecodeError, ValueError, AttributeError) as e:
+            print(f"Ignoring unreadable verification snapshot {self.snapshot_file}: {e}")
+
+    async def save_snapshot(self):
+        """Write the snapshot as compact JSON"""
+        data = {'guilds': self.snapshot}
+        try:
+            directory = os.path.dirname(self.snapshot_file)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            async with aiofiles.open(self.snapshot_file, 'w') as f:
+                await f.write(json.dumps(data, separators=(',', ':')))
+        except OSError as e:
+            print(f"Error saving verification snapshot {self.snapshot_file}: {e}")
+
+    def schedule_snapshot_save(self):
+        """Coalesce snapshot writes from member updates into one per interval"""
+        if self.snapshot_save_task is None or self.snapshot_save_task.done():
+            self.snapshot_save_task = asyncio.get_running_loop().create_task(self.delayed_snapshot_save())
+
+    async def delayed_snapshot_save(self):
+        await asyncio.sleep(config.VERIFICATION_SNAPSHOT_SAVE_SECONDS)
+        await self.save_snapshot()
+
+    def member_state(self, member: discord.Member) -> int:
+        """Verified/muted bits for a member"""
+        index = self.bot.role_index
+        guild_config = self.bot.guild_configs.get(member.guild.id)
+        return ((STATE_VERIFIED if index.has_role(member, guild_config.verified_role_id) else 0) |
+                (STATE_MUTED if index.has_role(member, guild_config.muted_role_id) else 0))
+
+    def record_member(self, member: discord.Member):
+        """Update a member's snapshot entry after their roles changed"""
+        members = self.snapshot.get(member.guild.id)
+        # Guilds without a completed scan have no snapshot to keep current
+        if member.bot or members is None:
+            return
+        members[member.id] = self.member_state(member)
+        self.schedule_snapshot_save()
+
+    def forget_member(self, member: discord.Member):
+        """Drop a member who left from the snapshot"""
+        if self.snapshot.get(member.guild.id, {}).pop(member.id, None) is not None:
+            self.schedule_snapshot_save()
+
+    def forget_guild(self, guild: discord.Guild):
+        """Stop scanning and drop the snapshot for a guild the bot left"""
+        self.cancel_scan(guild.id)
+        self.scan_progress.pop(guild.id, None)
+        if self.snapshot.pop(guild.id, None) is not None:
+            self.schedule_snapshot_save()
+
+    async def close(self):
+        """Persist the snapshot now instead of waiting for the pending save"""
+        self.cancel_scan()
+        await self.notifications.close()
+        if self.snapshot_save_task and not self.snapshot_save_task.done():
+            self.snapshot_save_task.cancel()
+            await self.save_snapshot()
+
+    def muted_embed(self, description: str) -> discord.Embed:
+        embed = discord.Embed(
+            title="🔇 You have been muted",
+            description=description,
+            color=config.EMBED_COLORS['warning']
+        )
+        embed.add_field(
+            name="How to get verified:",
+            value="Contact a staff member to get the verified role.",
+            inline=False
+        )
+        return embed
+
+    def unmuted_embed(self) -> discord.Embed:
+        return discord.Embed(
+            title="🔊 You have been unmuted",
+            description="You have been automatically unmuted because you now have the verified role.",
+            color=config.EMBED_COLORS['success']
+        )
 
     async def check_and_mute_unverified(self, member: discord.Member):
         """Check if member has verified role, mute if not"""
         try:
+            guild_config = self.bot.guild_configs.get(member.guild.id)
+            
             # Check if member has verified role
-            has_verified_role = any(role.id == config.VERIFIED_ROLE_ID for role in member.roles)
+            has_verified_role = self.bot.role_index.has_role(member, guild_config.verified_role_id)
             
             # Check if member already has muted role
-            has_muted_role = any(role.id == config.MUTED_ROLE_ID for role in member.roles)
+            has_muted_role = self.bot.role_index.has_role(member, guild_config.muted_role_id)
             
             if not has_verified_role and not has_muted_role:
                 # Add muted role
-                muted_role = member.guild.get_role(config.MUTED_ROLE_ID)
+                muted_role = member.guild.get_role(guild_config.muted_role_id)
                 if muted_role:
                     await member.add_roles(muted_role, reason="Auto-muted: No verified role")
                     print(f"Auto-muted {member} ({member.id}) - No verified role")
                     
-                    # Send DM to user
-                    try:
-                        embed = discord.Embed(
-                            title="🔇 You have been muted",
-                            description="You have been automatically muted because you don't have the verified role.",
-                            color=config.EMBED_COLORS['warning']
-                        )
-                        embed.add_field(
-                            name="How to get verified:",
-                            value="Contact a staff member to get the verified role.",
-                            inline=False
-                        )
-                        await member.send(embed=embed)
-                    except discord.Forbidden:
-                        print(f"Cannot send DM to {member} - DMs closed")
-                    except Exception as e:
-                        print(f"Error sending DM to {member}: {e}")
+                    # Queue DM to user
+                    self.notifications.notify(
+                        member,
+                        self.muted_embed("You have been automatically muted because you don't have the verified role."),
+                        muted=True
+                    )
                 else:
-                    print(f"Error: Muted role not found (ID: {config.MUTED_ROLE_ID})")
+                    print(f"Error: Muted role not found (ID: {guild_config.muted_role_id})")
             
             elif has_verified_role and has_muted_role:
                 # Remove muted role if they have verified role
-                muted_role = member.guild.get_role(config.MUTED_ROLE_ID)
+                muted_role = member.guild.get_role(guild_config.muted_role_id)
                 if muted_role:
                     await member.remove_roles(muted_role, reason="Auto-unmuted: Has verified role")
                     print(f"Auto-unmuted {member} ({member.id}) - Has verified role")
                     
-                    # Send DM to user
-                    try:
-                        embed = discord.Embed(
-                            title="🔊 You have been unmuted",
-                            description="You have been automatically unmuted because you now have the verified role.",
-                            color=config.EMBED_COLORS['success']
-                        )
-                        await member.send(embed=embed)
-                    except discord.Forbidden:
-                        print(f"Cannot send DM to {member} - DMs closed")
-                    except Exception as e:
-                        print(f"Error sending DM to {member}: {e}")
+                    # Queue DM to user
+                    self.notifications.notify(member, self.unmuted_embed(), muted=False)
                         
         except Exception as e:
             print(f"Error checking/muting member {member}: {e}")
 
-    async def scan_all_members(self):
-        """Scan all members in the guild and mute unverified ones"""
+    def start_scan(self, guild: discord.Guild, full: bool = False) -> bool:
+        """Submit a guild's member scan as a background job; False if one is running"""
+        progress = ScanProgress()
+        if not self.bot.jobs.submit(scan_job(guild.id), lambda: self.scan_all_members(guild, full, progress), progress):
+            return False
+        self.scan_progress[guild.id] = progress
+        return True
+
+    async def scan_all_guilds(self, full: bool = False):
+        """Once ready, start one scan job per guild; they run concurrently"""
+        await self.bot.wait_until_ready()
+        for guild in self.bot.guilds:
+            self.start_scan(guild, full)
+
+    def scan_running(self, guild_id: int) -> bool:
+        return self.bot.jobs.running(scan_job(guild_id))
+
+    def cancel_scan(self, guild_id: Optional[int] = None) -> bool:
+        """Cancel a guild's running scan (every guild's if None); False if none is running"""
+        guild_ids = [guild_id] if guild_id is not None else list(self.scan_progress)
+        cancelled = [self.bot.jobs.cancel(scan_job(guild_id)) for guild_id in guild_ids]
+        return any(cancelled)
+
+    async def scan_all_members(self, guild: discord.Guild, full: bool = True,
+                               progress: Optional[ScanProgress] = None):
+        """Scan all members in the guild and mute unverified ones.
+
+        Only members whose roles need changing cost a REST call. Those are
+        handed to SCAN_CONCURRENCY workers that pace role edits through a
+        shared token bucket, so a large guild neither stalls startup nor
+        trips Discord's rate limits.
+
+        Unless `full` is set, members whose verified/muted state matches the
+        snapshot from the last scan are left alone, so a restart only
+        reconciles members who changed, joined or left while offline.
+
+        With SCAN_STREAMING the member list is paged in over REST instead of
+        read from the member cache, and at most SCAN_PAGE_SIZE members are
+        held at once.
+        """
+        await self.bot.wait_until_ready()
+        guild_config = self.bot.guild_configs.get(guild.id)
+
+        progress = self.scan_progress[guild.id] = progress or ScanProgress()
+        progress.total = guild.member_count or len(guild.members)
+        progress.started_at = time.monotonic()
+        previous = self.snapshot.get(guild.id) if not full else None
+        print(f"Scanning {progress.total} members of {guild.id} for verification status"
+              f"{' (incremental)' if previous is not None else ''}...")
+
+        muted_role = guild.get_role(guild_config.muted_role_id)
+        if not muted_role:
+            print(f"Error: Muted role not found in {guild.id} (ID: {guild_config.muted_role_id})")
+            progress.finish()
+            return
+
+        current: Dict[int, int] = {}
+        completed = False
+        # Bounded hand-off to the workers; a full queue pauses the producer
+        pending: asyncio.Queue = asyncio.Queue(maxsize=max(1, config.SCAN_PAGE_SIZE))
+        loop = asyncio.get_running_loop()
+        reporter = loop.create_task(self.report_progress(progress))
+        workers = [loop.create_task(self.scan_worker(pending, muted_role, progress, current))
+                   for _ in range(max(1, config.SCAN_CONCURRENCY))]
         try:
-            if self.bot.guilds:
-                guild = self.bot.guilds[0]
-                print(f"Scanning {len(guild.members)} members for verification status...")
-                
-                muted_count = 0
-                unmuted_count = 0
-                
-                for member in guild.members:
-                    if not member.bot:  # Skip bots
-                        # Check if member has verified role
-                        has_verified_role = any(role.id == config.VERIFIED_ROLE_ID for role in member.roles)
-                        has_muted_role = any(role.id == config.MUTED_ROLE_ID for role in member.roles)
-                        
-                        if not has_verified_role and not has_muted_role:
-                            # Add muted role
-                            muted_role = guild.get_role(config.MUTED_ROLE_ID)
-                            if muted_role:
-                                await member.add_roles(muted_role, reason="Auto-muted: No verified role")
-                                muted_count += 1
-                                print(f"Muted {member} ({member.id})")
-                        
-                        elif has_verified_role and has_muted_role:
-                            # Remove muted role
-                            muted_role = guild.get_role(config.MUTED_ROLE_ID)
-                            if muted_role:
-                                await member.remove_roles(muted_role, reason="Auto-unmuted: Has verified role")
-                                unmuted_count += 1
-                                print(f"Unmuted {member} ({member.id})")
-                
-                print(f"Scan complete: {muted_count} members muted, {unmuted_count} members unmuted")
-                
+            if config.SCAN_STREAMING:
+                await self.stream_members_to_update(guild, pending, progress, previous, current)
+            else:
+                for item in self.members_to_update(guild, progress, previous, current):
+                    await pending.put(item)
+            for _ in workers:
+                await pending.put(None)
+            await asyncio.gather(*workers)
+            completed = True
+        except asyncio.CancelledError:
+            progress.cancelled = True
+            raise
         except Exception as e:
             print(f"Error scanning members: {e}")
+        finally:
+            progress.finish()
+            reporter.cancel()
+            for worker in workers:
+                worker.cancel()
+            # A partial scan would make unseen members look like they left
+            if completed:
+                if previous is not None:
+                    progress.left = len(previous.keys() - current.keys())
+                self.snapshot[guild.id] = current
+                await self.save_snapshot()
+            status = 'complete' if completed else 'cancelled' if progress.cancelled else 'failed'
+            print(f"Scan of {guild.id} {status}: {progress.summary()}")
+
+    def members_to_update(self, guild: discord.Guild, progress: ScanProgress, previous: Optional[Dict[int, int]],
+                          current: Dict[int, int]) -> Iterator[Tuple[discord.Member, bool]]:
+        """Work out who needs muting/unmuting by set difference on the role index.
+
+        Every member's state goes into `current`; compliant members whose
+        state is unchanged since `previous` are counted but not reconsidered.
+        Non-compliant members are always reconsidered, since the snapshot
+        also records states left wrong by a failed or out-of-scan change.
+        Yields (member, mute) pairs for the workers.
+        """
+        guild_config = self.bot.guild_configs.get(guild.id)
+        verified = self.bot.role_index.members_with(guild, guild_config.verified_role_id)
+        muted = self.bot.role_index.members_with(guild, guild_config.muted_role_id)
+        humans = {member.id for member in guild.members if not member.bot}
+
+        for member_id in humans:
+            current[member_id] = ((STATE_VERIFIED if member_id in verified else 0) |
+                                  (STATE_MUTED if member_id in muted else 0))
+        if previous is None:
+            candidates = humans
+        else:
+            candidates = {member_id for member_id, state in current.items()
+                          if previous.get(member_id) != state or state not in COMPLIANT_STATES}
+            progress.unchanged = len(humans) - len(candidates)
+
+        to_mute = candidates - verified - muted
+        to_unmute = candidates & verified & muted
+        progress.processed = len(guild.members) - len(to_mute) - len(to_unmute)
+
+        for member in guild.members:
+            if member.id in to_mute:
+                yield member, True
+            elif member.id in to_unmute:
+                yield member, False
+
+    async def stream_members_to_update(self, guild: discord.Guild, pending: asyncio.Queue, progress: ScanProgress,
+                                       previous: Optional[Dict[int, int]], current: Dict[int, int]):
+        """Page members in over REST and queue those whose muted role is wrong.
+
+        Fetched members are not added to the member cache, so only the
+        current page and the small per-member state map stay in memory.
+        """
+        guild_config = self.bot.guild_configs.get(guild.id)
+        async for member in guild.fetch_members(limit=None):
+            if member.bot:  # Skip bots
+                progress.processed += 1
+                continue
+            role_ids = self.bot.role_index.role_ids(member)
+            state = ((STATE_VERIFIED if guild_config.verified_role_id in role_ids else 0) |
+                     (STATE_MUTED if guild_config.muted_role_id in role_ids else 0))
+            current[member.id] = state
+            if previous is not None and previous.get(member.id) == state and state in COMPLIANT_STATES:
+                progress.unchanged += 1
+                progress.processed += 1
+            elif state == 0:
+                await pending.put((member, True))
+            elif state == STATE_VERIFIED | STATE_MUTED:
+                await pending.put((member, False))
+            else:
+                progress.processed += 1
+
+    async def scan_worker(self, pending: asyncio.Queue, muted_role: discord.Role,
+                          progress: ScanProgress, current: Dict[int, int]):
+        """Apply queued role changes until a None sentinel arrives"""
+        while True:
+            item = await pending.get()
+            if item is None:
+                return
+            member, mute = item
+            delay = self.scan_limiter.reserve(member.guild.id)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                if mute:
+                    await member.add_roles(muted_role, reason="Auto-muted: No verified role")
+                    progress.muted += 1
+                    current[member.id] |= STATE_MUTED
+                    print(f"Muted {member} ({member.id})")
+                else:
+                    await member.remove_roles(muted_role, reason="Auto-unmuted: Has verified role")
+                    progress.unmuted += 1
+                    current[member.id] &= ~STATE_MUTED
+                    print(f"Unmuted {member} ({member.id})")
+            except discord.HTTPException as e:
+                progress.errors += 1
+                # Leave them out of the snapshot so the next scan retries
+                current.pop(member.id, None)
+                print(f"Error updating roles for {member} ({member.id}): {e}")
+            progress.processed += 1
+
+    async def report_progress(self, progress: ScanProgress):
+        while True:
+            await asyncio.sleep(config.SCAN_PROGRESS_SECONDS)
+            print(f"Scan progress: {progress.summary()}")
 
     async def handle_member_update(self, before: discord.Member, after: discord.Member):
         """Handle member role updates"""
         try:
+            guild_config = self.bot.guild_configs.get(after.guild.id)
+            
             # Check if verified role was added or removed
-            before_verified = any(role.id == config.VERIFIED_ROLE_ID for role in before.roles)
-            after_verified = any(role.id == config.VERIFIED_ROLE_ID for role in after.roles)
+            before_verified = any(role.id == guild_config.verified_role_id for role in before.roles)
+            after_verified = any(role.id == guild_config.verified_role_id for role in after.roles)
             
             if not before_verified and after_verified:
                 # Member got verified role - unmute them
-                muted_role = after.guild.get_role(config.MUTED_ROLE_ID)
+                muted_role = after.guild.get_role(guild_config.muted_role_id)
                 if muted_role and muted_role in after.roles:
                     await after.remove_roles(muted_role, reason="Auto-unmuted: Got verified role")
                     print(f"Auto-unmuted {after} ({after.id}) - Got verified role")
                     
-                    # Send DM
-                    try:
-                        embed = discord.Embed(
-                            title="🔊 You have been unmuted",
-                            description="You have been automatically unmuted because you now have the verified role.",
-                            color=config.EMBED_COLORS['success']
-                        )
-                        await after.send(embed=embed)
-                    except discord.Forbidden:
-                        print(f"Cannot send DM to {after} - DMs closed")
-                    except Exception as e:
-                        print(f"Error sending DM to {after}: {e}")
+                    # Queue DM
+                    self.notifications.notify(after, self.unmuted_embed(), muted=False)
             
             elif before_verified and not after_verified:
                 # Member lost verified role - mute them
-                muted_role = after.guild.get_role(config.MUTED_ROLE_ID)
+                muted_role = after.guild.get_role(guild_config.muted_role_id)
                 if muted_role and muted_role not in after.roles:
                     await after.add_roles(muted_role, reason="Auto-muted: Lost verified role")
                     print(f"Auto-muted {after} ({after.id}) - Lost verified role")
                     
-                    # Send DM
-                    try:
-                        embed = discord.Embed(
-                            title="🔇 You have been muted",
-                            description="You have been automatically muted because you lost the verified role.",
-                            color=config.EMBED_COLORS['warning']
-                        )
-                        embed.add_field(
-                            name="How to get verified:",
-                            value="Contact a staff member to get the verified role.",
-                            inline=False
-                        )
-                        await after.send(embed=embed)
-                    except discord.Forbidden:
-                        print(f"Cannot send DM to {after} - DMs closed")
-                    except Exception as e:
-                        print(f"Error sending DM to {after}: {e}")
+                    # Queue DM
+                    self.notifications.notify(
+                        after,
+                        self.muted_embed("You have been automatically muted because you lost the verified role."),
+                        muted=True
+                    )
+
+            self.record_member(after)
                         
         except Exception as e:
-            print(f"Error handling member update: {e}") 
\ No newline at end of file
+            print(f"Error handling member update: {e}")
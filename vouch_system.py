@@ -1,14 +1,14 @@
 import discord
 from discord.ext import commands
 import config
-from data_manager import DataManager
 from image_processor import ImageProcessor
 from io import BytesIO
 
 class VouchSystem:
     def __init__(self, bot):
         self.bot = bot
-        self.data_manager = DataManager()
+        # Shared with the other systems so every read sees every write
+        self.data_manager = bot.data_manager
         self.image_processor = ImageProcessor()
 
     def is_image_attachment(self, message: discord.Message) -> bool:
@@ -73,12 +73,14 @@ class VouchSystem:
     async def process_vouch(self, message: discord.Message):
         """Process a vouch image - watermark and award points"""
         try:
+            guild_id = message.guild.id
+            
             # Check if user has admin role (bypass cooldown)
-            has_admin_role = any(role.id == config.ADMIN_ROLE_ID for role in message.author.roles)
+            has_admin_role = self.bot.role_index.has_role(message.author, self.bot.guild_configs.get(guild_id).admin_role_id)
             
             # Check if user is on cooldown (skip for admins)
-            if not has_admin_role and self.data_manager.is_on_cooldown(message.author.id):
-                remaining = self.data_manager.get_cooldown_remaining(message.author.id)
+            if not has_admin_role and self.data_manager.is_on_cooldown(guild_id, message.author.id):
+                remaining = self.data_manager.get_cooldown_remaining(guild_id, message.author.id)
                 hours = int(remaining.total_seconds() // 3600)
                 minutes = int((remaining.total_seconds() % 3600) // 60)
                 
@@ -145,14 +147,14 @@ class VouchSystem:
                         await self.send_fallback_vouch(message, image_attachment, final_size)
 
                 # Award points
-                await self.data_manager.add_points(message.author.id, config.POINTS_PER_VOUCH)
+                await self.data_manager.add_points(guild_id, message.author.id, config.POINTS_PER_VOUCH)
                 
                 # Set cooldown only for non-admin users
                 if not has_admin_role:
-                    await self.data_manager.set_cooldown(message.author.id)
+                    await self.data_manager.set_cooldown(guild_id, message.author.id)
 
                 # Send confirmation
-                points = self.data_manager.get_points(message.author.id)
+                points = self.data_manager.get_points(guild_id, message.author.id)
                 await message.channel.send(
                     f"Thanks for posting success {message.author.mention}! You now have {points} point(s). 💰",
                     delete_after=10
@@ -166,14 +168,14 @@ class VouchSystem:
                 await self.send_fallback_vouch(message, image_attachment, 0)
                 
                 # Award points even with fallback
-                await self.data_manager.add_points(message.author.id, config.POINTS_PER_VOUCH)
+                await self.data_manager.add_points(guild_id, message.author.id, config.POINTS_PER_VOUCH)
                 
                 # Set cooldown only for non-admin users
                 if not has_admin_role:
-                    await self.data_manager.set_cooldown(message.author.id)
+                    await self.data_manager.set_cooldown(guild_id, message.author.id)
                 
                 # Send confirmation
-                points = self.data_manager.get_points(message.author.id)
+                points = self.data_manager.get_points(guild_id, message.author.id)
                 await message.channel.send(
                     f"Thanks for posting success {message.author.mention}! You now have {points} point(s). 💰",
                     delete_after=10